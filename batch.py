@@ -0,0 +1,134 @@
+"""命令行批量计算（不依赖界面）
+
+输入为 JSONL，每行一个场景：
+    {"id": 1,
+     "A": {"unit": ["步兵", "西欧", "9", "Condotta Infantry"], "params": {"training": 50, ...}},
+     "B": {"unit": {"category": "骑兵", "tech_group": "西欧", "tech_level": 10, "name": "..."},
+           "params": {...}}}
+unit 可以是 [兵种, 科技组, 科技等级, 名称] 或同名字段的对象，未给出的参数按0处理。
+每个场景输出一行 JSON，包含 id 和 engine.RESULT_COLUMNS 的八项结果；
+无法计算的行输出 {"line": 行号, "error": 原因}，其余行照常计算。
+"""
+import json
+import math
+
+import engine
+import profiling
+
+CHUNK_SIZE = 1000  # 每批计算的场景数，内存占用与输入大小无关
+
+
+def _unit_key(spec):
+    """把单位标识转换为单位键"""
+    if isinstance(spec, dict):
+        spec = [spec.get(field) for field in ('category', 'tech_group', 'tech_level', 'name')]
+    if not isinstance(spec, (list, tuple)) or len(spec) != 4 or None in spec:
+        raise ValueError(f"无效的单位标识: {spec}")
+    tech_level = spec[2]
+    # 只接受整数或数字字符串，避免 9.7 之类被 int() 截断后匹配到其他单位
+    if isinstance(tech_level, bool) or not (isinstance(tech_level, int) or
+                                            isinstance(tech_level, str) and tech_level.isdecimal()):
+        raise ValueError(f"科技等级应为整数: {tech_level!r}")
+    return spec
+
+
+def _param_value(army, name, value):
+    """把参数转换为有限的浮点数（NaN、无穷大和超出范围的数无法输出为合法 JSON）"""
+    try:
+        value = float(value)
+    except OverflowError:
+        raise ValueError(f"{army}军参数 {name} 超出浮点数范围") from None
+    if not math.isfinite(value):
+        raise ValueError(f"{army}军参数 {name} 应为有限数值: {value}")
+    return value
+
+
+def parse_army(db, army, spec):
+    """解析一方的单位和参数，返回 (单位, 兵种, 参数)，army 为 "A" 或 "B"（用于错误信息）"""
+    if not isinstance(spec, dict):
+        raise ValueError(f"缺少{army}军")
+    key = _unit_key(spec.get('unit'))
+    unit_id = db.find(*key)
+    if unit_id is None:
+        raise ValueError(f"找不到{army}军单位: {key}")
+    params = engine.default_params(**{name: _param_value(army, name, value)
+                                      for name, value in spec.get('params', {}).items()})
+    return db.unit(unit_id), key[0], params
+
+
+def _param_columns(armies):
+    """把多组参数转换为按列的参数字典"""
+    return {name: [params[name] for _, _, params in armies] for name in engine.PARAM_NAMES}
+
+
+@profiling.instrument("batch.evaluate")
+def evaluate(pairs):
+    """批量计算一组已解析的场景 [(A军, B军), ...]，返回 {结果列: 列表}"""
+    a_armies = [a for a, _ in pairs]
+    b_armies = [b for _, b in pairs]
+    return engine.mutual_damage(
+        [unit['values'] for unit, _, _ in a_armies], [unit['values'] for unit, _, _ in b_armies],
+        _param_columns(a_armies), _param_columns(b_armies),
+        [category for _, category, _ in a_armies], [category for _, category, _ in b_armies])
+
+
+def _write_error(out, line_number, message):
+    """写出一行错误"""
+    out.write(json.dumps({'line': line_number, 'error': message}, ensure_ascii=False) + "\n")
+
+
+def _flush(entries, out):
+    """计算并按输入顺序写出一批场景，返回出错行数
+
+    entries 中每项为 (行号, id, A军, B军, 错误信息)，解析失败的行错误信息不为 None。
+    """
+    pairs = [(a, b) for _, _, a, b, error in entries if error is None]
+    try:
+        results = evaluate(pairs) if pairs else {}
+    except ZeroDivisionError:
+        # 整批失败时逐行计算，只让出错的行报告错误
+        if len(entries) == 1:
+            _write_error(out, entries[0][0], "除数为0（请检查军事战术）")
+            return 1
+        return sum(_flush([entry], out) for entry in entries)
+
+    errors = 0
+    row = 0
+    for line_number, scenario_id, _, _, error in entries:
+        if error is not None:
+            _write_error(out, line_number, error)
+            errors += 1
+            continue
+        record = {'id': scenario_id}
+        record.update((column, results[column][row]) for column in engine.RESULT_COLUMNS)
+        row += 1
+        if not all(math.isfinite(record[column]) for column in engine.RESULT_COLUMNS):
+            # 参数都有限时结果仍可能溢出为无穷大，不能输出为合法 JSON
+            _write_error(out, line_number, "结果超出浮点数范围")
+            errors += 1
+            continue
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return errors
+
+
+def run(lines, out, db, chunk_size=CHUNK_SIZE):
+    """逐行读取场景并流式写出结果，返回 (场景数, 出错行数)"""
+    entries = []
+    count = errors = 0
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        count += 1
+        try:
+            scenario = json.loads(line)
+            entries.append((line_number, scenario.get('id', line_number),
+                            parse_army(db, "A", scenario.get('A')),
+                            parse_army(db, "B", scenario.get('B')), None))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            entries.append((line_number, None, None, None, str(e)))
+        if len(entries) >= chunk_size:
+            errors += _flush(entries, out)
+            entries = []
+    if entries:
+        errors += _flush(entries, out)
+    return count, errors
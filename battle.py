@@ -0,0 +1,137 @@
+"""多日战斗模拟（基于同一伤害公式的蒙特卡洛模拟，支持多进程）"""
+import os
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import engine
+
+PHASE_DAYS = 3                   # 每个阶段持续的天数（火力、冲击交替）
+PHASES = ("fire", "shock")
+DEFAULT_WIDTH = 20               # 默认战斗宽度
+DEFAULT_MAX_DAYS = 100           # 超过该天数仍未分出胜负记为平局
+CHUNK_SIZE = 500                 # 每个任务模拟的战斗场数（每块使用独立的随机数流）
+
+
+def make_side(values, category, params, regiments=1):
+    """构造一方军队：同一单位的若干个团
+
+    params 中的 unit_count 为满编团人数(K)，max_morale 为初始士气，
+    dice 由模拟过程掷骰覆盖。
+    """
+    return {'values': list(values), 'category': category,
+            'params': dict(params), 'regiments': int(regiments)}
+
+
+def _frontline(strength, morale, width):
+    """取出仍可作战的团（按编号顺序，前 width 个上前线）"""
+    alive = [i for i in range(len(strength)) if strength[i] > 0 and morale[i] > 0]
+    return alive[:width]
+
+
+def _attack(side, enemy, attackers, strength, damage_type, dice):
+    """一方前线各团对各自目标造成的伤害，返回 (士气打击列表, 人力打击列表)"""
+    params = dict(side['params'], dice=dice,
+                  unit_count=[strength[i] / 1000 for i in attackers])
+    return engine.damage_batch([side['values']], [enemy['values']], params,
+                               enemy['params'], damage_type, side['category'])
+
+
+def simulate_battle(side_a, side_b, rng, width=DEFAULT_WIDTH, max_days=DEFAULT_MAX_DAYS):
+    """模拟一场战斗，返回 (胜方 'A'/'B'/None, 天数, A军伤亡, B军伤亡)"""
+    sides = (side_a, side_b)
+    strength = [[side['params']['unit_count'] * 1000] * side['regiments'] for side in sides]
+    morale = [[side['params']['max_morale']] * side['regiments'] for side in sides]
+    casualties = [0.0, 0.0]
+    dice = [0, 0]
+
+    for day in range(max_days):
+        if day % PHASE_DAYS == 0:
+            dice = [rng.randint(0, 9), rng.randint(0, 9)]
+        damage_type = PHASES[(day // PHASE_DAYS) % len(PHASES)]
+
+        fronts = [_frontline(strength[s], morale[s], width) for s in (0, 1)]
+        if not fronts[0] or not fronts[1]:
+            break
+
+        # 双方同时结算：先算出全部伤害，再统一扣减
+        hits = []
+        for s in (0, 1):
+            attackers, enemy_front = fronts[s], fronts[1 - s]
+            targets = [enemy_front[k % len(enemy_front)] for k in range(len(attackers))]
+            morale_damage, manpower_damage = _attack(sides[s], sides[1 - s], attackers,
+                                                     strength[s], damage_type, dice[s])
+            hits.append((targets, morale_damage, manpower_damage))
+
+        for s, (targets, morale_damage, manpower_damage) in enumerate(hits):
+            enemy = 1 - s
+            for target, lost_morale, lost_men in zip(targets, morale_damage, manpower_damage):
+                # 防御点数高于进攻时公式可能为负，按0处理
+                lost_men = min(max(lost_men, 0.0), strength[enemy][target])
+                strength[enemy][target] -= lost_men
+                morale[enemy][target] -= max(lost_morale, 0.0)
+                casualties[enemy] += lost_men
+    else:
+        day = max_days
+
+    broken = [not _frontline(strength[s], morale[s], 1) for s in (0, 1)]
+    if broken[0] and not broken[1]:
+        winner = 'B'
+    elif broken[1] and not broken[0]:
+        winner = 'A'
+    else:
+        winner = None
+    return winner, day, casualties[0], casualties[1]
+
+
+def _run_chunk(side_a, side_b, battles, seed, chunk, width, max_days):
+    """模拟一块战斗（在工作进程中运行），返回汇总计数"""
+    # 每块使用由 (种子, 块编号) 确定的独立随机数流，结果与进程数无关
+    rng = random.Random(f"{seed}:{chunk}")
+    wins = Counter()
+    lengths = Counter()
+    casualties = [0.0, 0.0]
+    for _ in range(battles):
+        winner, days, lost_a, lost_b = simulate_battle(side_a, side_b, rng, width, max_days)
+        wins[winner] += 1
+        lengths[days] += 1
+        casualties[0] += lost_a
+        casualties[1] += lost_b
+    return wins, lengths, casualties
+
+
+def simulate(side_a, side_b, battles=10000, seed=0, workers=None,
+             width=DEFAULT_WIDTH, max_days=DEFAULT_MAX_DAYS):
+    """并行模拟多场战斗，返回胜率、期望伤亡和战斗天数分布
+
+    workers 为进程数（默认CPU核数，1 表示在当前进程内运行）。
+    相同 seed 在任意进程数下得到相同结果。
+    """
+    chunks = [(i, min(CHUNK_SIZE, battles - start))
+              for i, start in enumerate(range(0, battles, CHUNK_SIZE))]
+    args = [(side_a, side_b, size, seed, i, width, max_days) for i, size in chunks]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) <= 1:
+        results = [_run_chunk(*arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            results = list(pool.map(_run_chunk, *zip(*args)))
+
+    wins = Counter()
+    lengths = Counter()
+    casualties = [0.0, 0.0]
+    for chunk_wins, chunk_lengths, chunk_casualties in results:
+        wins.update(chunk_wins)
+        lengths.update(chunk_lengths)
+        casualties[0] += chunk_casualties[0]
+        casualties[1] += chunk_casualties[1]
+
+    total = max(battles, 1)
+    return {
+        'battles': battles,
+        'win_probability': {'A': wins['A'] / total, 'B': wins['B'] / total,
+                            'draw': wins[None] / total},
+        'expected_casualties': {'A': casualties[0] / total, 'B': casualties[1] / total},
+        'length_distribution': {days: count / total for days, count in sorted(lengths.items())},
+    }
@@ -0,0 +1,177 @@
+"""无界面的性能基准
+
+    python v1.1.py bench [-d 炮兵.txt ...] [--quick] [--baseline 上次结果.json] [-o 结果.json]
+
+依次测量数据文件解析（原文件及放大 10 倍、100 倍的合成副本）、单场景伤害、
+批量伤害和全兵种对战矩阵，报告耗时、吞吐量和峰值内存（tracemalloc）。
+峰值内存需要在 tracemalloc 下把每项再完整运行一次（慢数倍），--quick 时不测。
+吞吐量低于 THRESHOLDS 中的下限，或比基准结果慢 REGRESSION_TOLERANCE 以上时视为退化。
+"""
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import engine
+import matrix
+import unitdata
+
+SCALES = (1, 10, 100)        # 合成数据的放大倍数
+SINGLE_CALLS = 20000         # 单场景伤害的调用次数
+BATCH_ROWS = 200000          # 批量伤害的行数
+MIN_SECONDS = 0.2            # 每项至少累计运行的时间，耗时很短的基准会多运行几次
+REGRESSION_TOLERANCE = 0.3   # 比基准慢（或峰值内存多）30% 以上视为退化
+MEMORY_SLACK = 1 << 20       # 峰值内存的比较另外允许 1MB 的波动
+
+# 各项吞吐量的下限（每秒），远低于普通机器的实测值，只用于发现数量级的退化
+THRESHOLDS = {
+    "parse_x1": 5000,
+    "parse_x10": 5000,
+    "parse_x100": 5000,
+    "single_damage": 5000,
+    "batch_damage": 50000,
+    "matchup_matrix": 200000,
+}
+
+# 基准使用的参数（接近游戏中期的常见取值）
+BENCH_PARAMS = engine.default_params(
+    unit_count=1000, fire_value=0.35, shock_value=0.5, military_tactics=2.5,
+    max_morale=3, avg_max_morale=3, training=100, dice=5)
+
+
+def scale_file(source, target, factor):
+    """生成放大的合成数据：每个单位重复 factor 次，名称加编号保证唯一"""
+    with open(source, 'r', encoding='utf-8') as src, \
+            open(target, 'w', encoding='utf-8') as out:
+        for line in src:
+            parts = line.rstrip('\r\n').split('\t')
+            if len(parts) < 3:
+                out.write(line.rstrip('\r\n') + "\n")
+                continue
+            for copy in range(factor):
+                if copy:
+                    parts[1] = f"{parts[1].split(' #')[0]} #{copy}"
+                out.write("\t".join(parts) + "\n")
+
+
+def measure(name, func, items, unit, repeat=3, memory=True):
+    """运行 func 至少 repeat 次（且累计至少 MIN_SECONDS）取最短耗时，
+    memory 为真时另运行一次测量峰值内存（否则记为 None），返回结果记录
+    """
+    best = None
+    runs = total = 0
+    while runs < repeat or total < MIN_SECONDS:
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        runs += 1
+        total += elapsed
+
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {'name': name, 'seconds': best, 'items': items, 'unit': unit,
+            'throughput': items / best if best else float('inf'), 'peak_bytes': peak}
+
+
+def run(data_files, scales=SCALES, repeat=3, memory=True):
+    """运行全部基准（data_files 为数据文件列表，基础数据在前），返回结果记录列表
+
+    memory 为假时跳过峰值内存的测量。
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for factor in scales:
+            paths = list(data_files)
+            if factor != 1:
+                paths = [os.path.join(workdir, f"x{factor}_{k}.txt") for k in range(len(data_files))]
+                for source, path in zip(data_files, paths):
+                    scale_file(source, path, factor)
+            units = len(unitdata.UnitDB.from_files(paths))
+            results.append(measure(f"parse_x{factor}", lambda: unitdata.UnitDB.from_files(paths),
+                                   units, "units", repeat, memory))
+
+    db = unitdata.UnitDB.from_files(data_files)
+    n = len(db)
+    values = [db.values(i) for i in range(n)]
+    categories = [db.key(i)[0] for i in range(n)]
+
+    def single():
+        for k in range(SINGLE_CALLS):
+            engine.calculate_damage(values[k % n], values[(k * 7) % n], BENCH_PARAMS,
+                                    BENCH_PARAMS, "fire" if k % 2 else "shock", categories[k % n])
+    results.append(measure("single_damage", single, SINGLE_CALLS, "calls", repeat, memory))
+
+    attacker_values = [values[k % n] for k in range(BATCH_ROWS // 2)]
+    defender_values = [values[(k * 7) % n] for k in range(BATCH_ROWS // 2)]
+    attacker_categories = [categories[k % n] for k in range(BATCH_ROWS // 2)]
+
+    def batched():
+        for damage_type in engine.DAMAGE_TYPES:
+            engine.damage_batch(attacker_values, defender_values, BENCH_PARAMS, BENCH_PARAMS,
+                                damage_type, attacker_categories)
+    results.append(measure("batch_damage", batched, BATCH_ROWS // 2 * 2, "rows", repeat, memory))
+
+    cells = len(matrix.DAMAGE_TYPES) * n * n * len(matrix.DICE)
+    results.append(measure("matchup_matrix",
+                           lambda: matrix.build_values(db, BENCH_PARAMS, BENCH_PARAMS),
+                           cells, "cells", repeat, memory))
+    return results
+
+
+def check(results, baseline=None, thresholds=THRESHOLDS, tolerance=REGRESSION_TOLERANCE):
+    """检查退化，返回问题描述列表（为空表示通过）"""
+    previous = {result['name']: result for result in baseline or ()}
+    problems = []
+    for result in results:
+        name = result['name']
+        minimum = thresholds.get(name)
+        if minimum is not None and result['throughput'] < minimum:
+            problems.append(f"{name}: 吞吐量 {result['throughput']:.0f} {result['unit']}/s "
+                            f"低于下限 {minimum}")
+        if name in previous:
+            expected = previous[name]['throughput'] * (1 - tolerance)
+            if result['throughput'] < expected:
+                problems.append(f"{name}: 吞吐量 {result['throughput']:.0f} {result['unit']}/s "
+                                f"比基准 {previous[name]['throughput']:.0f} 慢 "
+                                f"{1 - result['throughput'] / previous[name]['throughput']:.0%}")
+            peak, previous_peak = result['peak_bytes'], previous[name]['peak_bytes']
+            # 任一方未测峰值内存时不比较
+            if None not in (peak, previous_peak) and \
+                    peak > previous_peak * (1 + tolerance) + MEMORY_SLACK:
+                problems.append(f"{name}: 峰值内存 {result['peak_bytes'] / 1e6:.1f} MB "
+                                f"比基准 {previous[name]['peak_bytes'] / 1e6:.1f} MB 多 "
+                                f"{result['peak_bytes'] / previous[name]['peak_bytes'] - 1:.0%}")
+    return problems
+
+
+def format_results(results):
+    """把结果格式化为文本表格"""
+    lines = [f"{'基准':<16}{'耗时(s)':>10}{'数量':>12}{'吞吐量(/s)':>16}{'峰值内存(MB)':>14}"]
+    for result in results:
+        peak = "-" if result['peak_bytes'] is None else f"{result['peak_bytes'] / 1e6:.1f}"
+        lines.append(f"{result['name']:<16}{result['seconds']:>10.3f}"
+                     f"{result['items']:>12}{result['throughput']:>16,.0f}{peak:>14}")
+    return "\n".join(lines)
+
+
+def load_results(path):
+    """读取之前保存的基准结果"""
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)['results']
+
+
+def save_results(path, results):
+    """保存基准结果，供之后用 --baseline 比较"""
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({'results': results}, file, ensure_ascii=False, indent=2)
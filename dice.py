@@ -0,0 +1,102 @@
+"""骰子结果的精确伤害分布（解析计算，无需随机抽样）"""
+import engine
+
+DICE_FACES = 10  # 骰子为 0-9 均匀分布
+DIGITS = 9       # 累计伤害保留的小数位，合并不同加法顺序产生的浮点误差
+
+
+def _phase_counts(values):
+    """单阶段的分布 {伤害: 出现次数}，values 为各骰子点数的伤害，负伤害按0处理"""
+    counts = {}
+    for value in values:
+        value = max(value, 0.0)
+        counts[value] = counts.get(value, 0) + 1
+    return counts
+
+
+def _convolve(first, second):
+    """两个独立阶段的伤害之和的分布"""
+    result = {}
+    for a, count_a in first.items():
+        for b, count_b in second.items():
+            total = round(a + b, DIGITS)
+            result[total] = result.get(total, 0) + count_a * count_b
+    return result
+
+
+class DamageDistribution:
+    """离散伤害分布：按伤害升序保存取值和对应的出现次数（整数，精确）"""
+
+    def __init__(self, values, counts):
+        merged = {}
+        for value, count in zip(values, counts):
+            if count:
+                merged[value] = merged.get(value, 0) + count
+        self.values = sorted(merged)
+        self.counts = [merged[value] for value in self.values]
+        self.total = sum(self.counts)
+
+    @property
+    def probabilities(self):
+        """各取值的概率"""
+        return [count / self.total for count in self.counts]
+
+    def expected(self):
+        """期望值"""
+        return sum(value * count for value, count in zip(self.values, self.counts)) / self.total
+
+    def variance(self):
+        """方差"""
+        mean = self.expected()
+        return sum((value - mean) ** 2 * count
+                   for value, count in zip(self.values, self.counts)) / self.total
+
+    def percentile(self, q):
+        """第 q 百分位（0-100）：累计概率不小于 q% 的最小取值"""
+        if not 0 <= q <= 100:
+            raise ValueError(f"百分位应在0到100之间: {q}")
+        threshold = q * self.total
+        cumulative = 0
+        for value, count in zip(self.values, self.counts):
+            cumulative += count
+            if cumulative * 100 >= threshold:
+                return value
+        return self.values[-1]
+
+    def __repr__(self):
+        return f"DamageDistribution(expected={self.expected():.4f}, support={len(self.values)})"
+
+
+def damage_distributions(attacker_values, defender_values, attacker_params, defender_params,
+                         damage_type, attacker_category="炮兵", phases=1):
+    """批量计算 N 个阶段累计伤害的精确分布
+
+    参数与 engine.damage_batch 相同（其中 dice 被忽略，由骰子分布代替）。
+    每个骰子点数单独计算一批，每个阶段的负伤害按0处理（与 battle.py 一致），
+    N 个阶段的累计分布为单阶段分布的 N 次卷积。
+    返回 [(士气打击分布, 人力打击分布), ...]。
+    """
+    if phases < 1:
+        raise ValueError(f"阶段数至少为1: {phases}")
+    faces = [engine.damage_batch(attacker_values, defender_values, dict(attacker_params, dice=face),
+                                 defender_params, damage_type, attacker_category)
+             for face in range(DICE_FACES)]
+
+    results = []
+    for row in range(len(faces[0][0])):
+        distributions = []
+        for column in (0, 1):  # 士气打击、人力打击
+            phase = _phase_counts(face[column][row] for face in faces)
+            counts = phase
+            for _ in range(phases - 1):
+                counts = _convolve(counts, phase)
+            distributions.append(DamageDistribution(list(counts), list(counts.values())))
+        results.append(tuple(distributions))
+    return results
+
+
+def damage_distribution(attacker_values, defender_values, attacker_params, defender_params,
+                        damage_type, attacker_category="炮兵", phases=1):
+    """计算单个组合 N 个阶段累计伤害的精确分布，返回 (士气打击分布, 人力打击分布)"""
+    return damage_distributions([attacker_values], [defender_values], attacker_params,
+                                defender_params, damage_type, attacker_category, phases)[0]
@@ -0,0 +1,302 @@
+"""战斗伤害计算引擎（不依赖界面，支持批量计算）"""
+from itertools import repeat
+
+import profiling
+
+# 每支军队的参数名（与界面输入框一一对应）
+PARAM_NAMES = [
+    'morale_impact_bonus', 'morale_impact_reduction', 'max_morale',
+    'avg_max_morale', 'shock_damage_bonus', 'fire_damage_bonus',
+    'shock_damage_reduction', 'fire_damage_reduction', 'dice',
+    'dice_modifier', 'unit_count', 'shock_value', 'fire_value',
+    'infantry_combat_bonus', 'cavalry_combat_bonus',
+    'artillery_combat_bonus', 'training', 'time', 'military_tactics'
+]
+
+# 单位的六项属性（点数）
+ATTRIBUTES = ["火力进攻", "火力防御", "冲击进攻", "冲击防御", "士气进攻", "士气防御"]
+
+# 兵种对应的作战加成参数（未知兵种按炮兵处理，与原界面一致）
+COMBAT_BONUS = {
+    "步兵": 'infantry_combat_bonus',
+    "骑兵": 'cavalry_combat_bonus',
+    "炮兵": 'artillery_combat_bonus',
+}
+
+# 攻击类型 -> (进攻属性索引, 防御属性索引, 伤害加成, 伤害减成, 攻击值)
+DAMAGE_TYPES = {
+    "fire": (0, 1, 'fire_damage_bonus', 'fire_damage_reduction', 'fire_value'),
+    "shock": (2, 3, 'shock_damage_bonus', 'shock_damage_reduction', 'shock_value'),
+}
+
+MORALE_ATTACK = 4   # 士气进攻
+MORALE_DEFENSE = 5  # 士气防御
+
+# 作为防御方时才用到的参数（training 双方都会用到）
+DEFENDER_PARAMS = {'military_tactics', 'training', 'morale_impact_reduction',
+                   'fire_damage_reduction', 'shock_damage_reduction'}
+ATTACKER_PARAMS = (set(PARAM_NAMES) - DEFENDER_PARAMS) | {'training'}
+
+# 只影响一种攻击类型的参数
+TYPE_PARAMS = {
+    name: damage_type
+    for damage_type, (_, _, bonus, reduction, value) in DAMAGE_TYPES.items()
+    for name in (bonus, reduction, value)
+}
+
+# 双方互相打击的结果列（与界面的八个结果一一对应）
+RESULT_COLUMNS = [
+    f"{army}_{damage_type}_{result}"
+    for army in ("a", "b")
+    for damage_type in DAMAGE_TYPES
+    for result in ("morale", "manpower")
+]
+
+
+def dependent_results(army, name):
+    """某一方的参数变化后需要重算的结果，返回 {(攻击方, 攻击类型), ...}"""
+    other = "B" if army == "A" else "A"
+    damage_types = [TYPE_PARAMS[name]] if name in TYPE_PARAMS else list(DAMAGE_TYPES)
+    results = set()
+    if name in ATTACKER_PARAMS:
+        results.update((army, damage_type) for damage_type in damage_types)
+    if name in DEFENDER_PARAMS:
+        results.update((other, damage_type) for damage_type in damage_types)
+    return results
+
+
+def default_params(**overrides):
+    """返回一组参数（默认全为0，与界面初始值一致）"""
+    params = {name: 0.0 for name in PARAM_NAMES}
+    for name, value in overrides.items():
+        if name not in params:
+            raise KeyError(f"未知参数: {name}")
+        params[name] = value
+    return params
+
+
+def _is_column(value):
+    """判断参数是序列（按列批量）还是标量"""
+    return hasattr(value, '__len__') and not isinstance(value, (str, bytes))
+
+
+def _broadcast(columns):
+    """把标量和序列广播为等长的列（长度为1的序列与标量一样会被重复）"""
+    n = 1
+    for value in columns:
+        if _is_column(value) and len(value) != 1:
+            if n != 1 and len(value) != n:
+                raise ValueError(f"批量参数长度不一致: {len(value)} 与 {n}")
+            n = len(value)
+    result = []
+    for value in columns:
+        if not _is_column(value):
+            result.append(repeat(value, n))
+        elif len(value) == 1:
+            result.append(repeat(value[0], n))
+        else:
+            result.append(value)
+    return n, result
+
+
+def _combat_bonus(categories, *bonus_columns):
+    """逐行按兵种选出作战加成，产出 (参数名, 加成)
+
+    bonus_columns 按 COMBAT_BONUS 的顺序给出三个兵种的加成列，未知兵种按炮兵处理。
+    """
+    names = list(COMBAT_BONUS.values())
+    index = {category: k for k, category in enumerate(COMBAT_BONUS)}
+    fallback = index["炮兵"]
+    for category, bonuses in zip(categories, zip(*bonus_columns)):
+        k = index.get(category, fallback)
+        yield names[k], bonuses[k]
+
+
+def _damage_columns(attacker_values, defender_values, attacker_params, defender_params,
+                    damage_type, attacker_category):
+    """按攻击类型取出计算所需的列并广播，返回 (行数, 列)
+
+    列的顺序与 damage_batch / damage_gradient_batch 中逐行解包的顺序一致，
+    兵种和三个兵种的作战加成合并为一列 (作战加成参数名, 加成)。
+    """
+    if damage_type not in DAMAGE_TYPES:
+        raise ValueError(f"未知的攻击类型: {damage_type}")
+    _, _, bonus_name, reduction_name, value_name = DAMAGE_TYPES[damage_type]
+    n, columns = _broadcast([
+        attacker_values, defender_values,
+        # 攻击方参数
+        attacker_params['dice'], attacker_params['dice_modifier'],
+        attacker_params['unit_count'], attacker_params[value_name],
+        attacker_params['training'], attacker_params['time'],
+        attacker_params['morale_impact_bonus'],
+        attacker_params['max_morale'], attacker_params['avg_max_morale'],
+        attacker_params[bonus_name],
+        # 防御方参数
+        defender_params['military_tactics'], defender_params['training'],
+        defender_params['morale_impact_reduction'], defender_params[reduction_name],
+        # 兵种及其作战加成
+        attacker_category, *(attacker_params[name] for name in COMBAT_BONUS.values()),
+    ])
+    combat = _combat_bonus(*columns[-1 - len(COMBAT_BONUS):])
+    return n, columns[:-1 - len(COMBAT_BONUS)] + [combat]
+
+
+@profiling.instrument("engine.damage_batch")
+def damage_batch(attacker_values, defender_values, attacker_params, defender_params,
+                 damage_type, attacker_category="炮兵"):
+    """批量计算伤害值
+
+    attacker_values / defender_values 是单位属性（6个点数）的序列，
+    参数字典的每一项和 attacker_category 可以是标量或序列，
+    标量和长度为1的序列会自动广播。返回 (士气打击列表, 人力打击列表)。
+    """
+    n, columns = _damage_columns(attacker_values, defender_values, attacker_params,
+                                 defender_params, damage_type, attacker_category)
+    offensive, defensive = DAMAGE_TYPES[damage_type][:2]
+
+    profiling.count("engine.damage_batch.rows", n)
+    morale_damage = [0.0] * n
+    manpower_damage = [0.0] * n
+    for i, (attacker_unit, defender_unit, dice, dice_mod, unit_count, attack_value,
+            training, time, morale_bonus, max_morale, avg_morale, damage_bonus,
+            military_tactics, defender_training, morale_reduction, damage_reduction,
+            (combat_name, combat_bonus)) in enumerate(zip(*columns)):
+        # 计算点数因子
+        point_factor = 15 + 5 * (dice + dice_mod + attacker_unit[offensive]
+                                 + attacker_unit[MORALE_ATTACK]
+                                 - defender_unit[defensive]
+                                 - defender_unit[MORALE_DEFENSE])
+
+        # 计算战力因子
+        power_factor = (unit_count * attack_value / military_tactics *
+                        (1 + combat_bonus) * (1 + training / 100) *
+                        (1 + time / 100) / (1 + defender_training / 100))
+
+        base = point_factor * power_factor
+        morale_damage[i] = (base * (1 + morale_bonus) * (1 - morale_reduction) *
+                            max_morale / 540 + 0.01 * avg_morale)
+        manpower_damage[i] = base * (1 + damage_bonus) * (1 - damage_reduction)
+
+    return morale_damage, manpower_damage
+
+
+def gradient_names():
+    """偏导数的全部变量 [(攻击方/防御方, 参数名或属性名), ...]"""
+    return [(role, name) for role in ("attacker", "defender") for name in PARAM_NAMES + ATTRIBUTES]
+
+
+@profiling.instrument("engine.damage_gradient_batch")
+def damage_gradient_batch(attacker_values, defender_values, attacker_params, defender_params,
+                          damage_type, attacker_category="炮兵"):
+    """批量计算伤害值及其对全部参数和点数的偏导数（解析式）
+
+    参数规则与 damage_batch 相同。返回 (士气打击列表, 人力打击列表, 偏导数)，
+    偏导数为 {(角色, 名称): (士气偏导列表, 人力偏导列表)}，角色为 "attacker" / "defender"，
+    名称为 PARAM_NAMES 中的参数或 ATTRIBUTES 中的属性，与本次计算无关的变量偏导为0。
+    """
+    n, columns = _damage_columns(attacker_values, defender_values, attacker_params,
+                                 defender_params, damage_type, attacker_category)
+    offensive, defensive, bonus_name, reduction_name, value_name = DAMAGE_TYPES[damage_type]
+
+    morale_damage = [0.0] * n
+    manpower_damage = [0.0] * n
+    gradients = {key: ([0.0] * n, [0.0] * n) for key in gradient_names()}
+    # 只影响点数因子的变量，每点使点数因子变化 ±5
+    point_columns = [gradients[("attacker", 'dice')], gradients[("attacker", 'dice_modifier')],
+                     gradients[("attacker", ATTRIBUTES[offensive])],
+                     gradients[("attacker", ATTRIBUTES[MORALE_ATTACK])]]
+    point_defense_columns = [gradients[("defender", ATTRIBUTES[defensive])],
+                             gradients[("defender", ATTRIBUTES[MORALE_DEFENSE])]]
+
+    for i, (attacker_unit, defender_unit, dice, dice_mod, unit_count, attack_value,
+            training, time, morale_bonus, max_morale, avg_morale, damage_bonus,
+            military_tactics, defender_training, morale_reduction, damage_reduction,
+            (combat_name, combat_bonus)) in enumerate(zip(*columns)):
+        point_factor = 15 + 5 * (dice + dice_mod + attacker_unit[offensive]
+                                 + attacker_unit[MORALE_ATTACK]
+                                 - defender_unit[defensive]
+                                 - defender_unit[MORALE_DEFENSE])
+
+        # 战力因子是各因子的乘积，对某一因子的偏导为其余因子之积（直接写出，避免除以0）
+        strength = unit_count * attack_value / military_tactics
+        combat = 1 + combat_bonus
+        attack = 1 + training / 100
+        duration = 1 + time / 100
+        resistance = 1 + defender_training / 100
+        power_factor = strength * combat * attack * duration / resistance
+        modifiers = combat * attack * duration / resistance
+
+        base = point_factor * power_factor
+        morale_scale = (1 + morale_bonus) * (1 - morale_reduction) * max_morale / 540
+        manpower_scale = (1 + damage_bonus) * (1 - damage_reduction)
+        morale_damage[i] = base * morale_scale + 0.01 * avg_morale
+        manpower_damage[i] = base * manpower_scale
+
+        # 对 base 的偏导，换算为士气、人力打击的偏导
+        d_point = 5 * power_factor
+        for morale_column, manpower_column in point_columns:
+            morale_column[i] = d_point * morale_scale
+            manpower_column[i] = d_point * manpower_scale
+        for morale_column, manpower_column in point_defense_columns:
+            morale_column[i] = -d_point * morale_scale
+            manpower_column[i] = -d_point * manpower_scale
+
+        for key, d_power in (
+                (("attacker", 'unit_count'), attack_value / military_tactics * modifiers),
+                (("attacker", value_name), unit_count / military_tactics * modifiers),
+                (("defender", 'military_tactics'), -power_factor / military_tactics),
+                (("attacker", combat_name), strength * attack * duration / resistance),
+                (("attacker", 'training'), strength * combat * duration / resistance / 100),
+                (("attacker", 'time'), strength * combat * attack / resistance / 100),
+                (("defender", 'training'), -power_factor / resistance / 100)):
+            morale_column, manpower_column = gradients[key]
+            morale_column[i] = point_factor * d_power * morale_scale
+            manpower_column[i] = point_factor * d_power * manpower_scale
+
+        # 士气打击、人力打击各自的系数
+        gradients[("attacker", 'morale_impact_bonus')][0][i] = (
+            base * (1 - morale_reduction) * max_morale / 540)
+        gradients[("defender", 'morale_impact_reduction')][0][i] = (
+            -base * (1 + morale_bonus) * max_morale / 540)
+        gradients[("attacker", 'max_morale')][0][i] = (
+            base * (1 + morale_bonus) * (1 - morale_reduction) / 540)
+        gradients[("attacker", 'avg_max_morale')][0][i] = 0.01
+        gradients[("attacker", bonus_name)][1][i] = base * (1 - damage_reduction)
+        gradients[("defender", reduction_name)][1][i] = -base * (1 + damage_bonus)
+
+    return morale_damage, manpower_damage, gradients
+
+
+@profiling.instrument("engine.calculate_damage")
+def calculate_damage(attacker_values, defender_values, attacker_params, defender_params,
+                     damage_type, attacker_category="炮兵", gradient=False):
+    """计算单次伤害值，返回 (士气打击, 人力打击)
+
+    gradient=True 时额外返回偏导数 {(角色, 名称): (士气偏导, 人力偏导)}，见 damage_gradient_batch。
+    """
+    if gradient:
+        morale, manpower, gradients = damage_gradient_batch(
+            [attacker_values], [defender_values], attacker_params, defender_params,
+            damage_type, attacker_category)
+        return morale[0], manpower[0], {key: (m[0], p[0]) for key, (m, p) in gradients.items()}
+    morale, manpower = damage_batch([attacker_values], [defender_values],
+                                    attacker_params, defender_params,
+                                    damage_type, attacker_category)
+    return morale[0], manpower[0]
+
+
+def mutual_damage(a_values, b_values, a_params, b_params, a_category="炮兵", b_category="炮兵"):
+    """批量计算A军与B军互相打击的全部结果
+
+    参数的批量规则与 damage_batch 相同，返回 {结果列: 列表}。
+    """
+    results = {}
+    for army, attacker_values, defender_values, attacker_params, defender_params, category in (
+            ("a", a_values, b_values, a_params, b_params, a_category),
+            ("b", b_values, a_values, b_params, a_params, b_category)):
+        for damage_type in DAMAGE_TYPES:
+            morale, manpower = damage_batch(attacker_values, defender_values, attacker_params,
+                                            defender_params, damage_type, category)
+            results[f"{army}_{damage_type}_morale"] = morale
+            results[f"{army}_{damage_type}_manpower"] = manpower
+    return results
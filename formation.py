@@ -0,0 +1,144 @@
+"""整军阵型计算：按战斗宽度自动排布前后排，一次算出所有团之间的伤害
+
+取代原先"前排对前排、后排炮兵单方面打击前排"的三次手动计算：
+后排炮兵的伤害系数和后排炮兵给前排的防御点数加成都会自动计入。
+"""
+import engine
+
+BACKLINE_ARTILLERY_FACTOR = 0.5  # 后排炮兵的伤害系数
+BACKLINE_DEFENSE_SHARE = 0.5     # 后排炮兵把防御点数的一半（向下取整）加给正前方的团
+DEFENSIVE_COLUMNS = (1, 3)       # 火力防御、冲击防御
+DEFAULT_WIDTH = 20               # 默认战斗宽度
+
+# 侧击范围：团只能打击与自己位置相差不超过该格数的敌方前排团，范围内没有敌人时不参与打击
+FLANKING_RANGE = {"步兵": 1, "骑兵": 2, "炮兵": 2}
+
+
+def _unit_values(unit):
+    """单位可以是属性列表，也可以是单位库中的单位记录"""
+    if isinstance(unit, (list, tuple)):
+        return list(unit)
+    return list(unit['values'])
+
+
+def make_army(params, infantry=None, cavalry=None, artillery=None):
+    """构造一支军队，infantry / cavalry / artillery 为 (单位, 团数)"""
+    regiments = {}
+    for category, entry in (("步兵", infantry), ("骑兵", cavalry), ("炮兵", artillery)):
+        if entry is not None:
+            unit, count = entry
+            regiments[category] = (_unit_values(unit), int(count))
+    return {'params': dict(params), 'regiments': regiments}
+
+
+def layout(army, width=DEFAULT_WIDTH):
+    """排布阵型，返回 (前排, 后排)
+
+    每排为长度 width 的列表，元素为 (兵种, 属性) 或 None。
+    前排先放步兵、再放骑兵，步兵居中、骑兵分列两翼，没有步兵和骑兵时炮兵上前排；
+    炮兵居中排在后排，排不下的团作为预备队不参与本次计算。
+    """
+    counts = {category: army['regiments'].get(category, (None, 0))[1]
+              for category in ("步兵", "骑兵", "炮兵")}
+    front_infantry = min(counts["步兵"], width)
+    front_cavalry = min(counts["骑兵"], width - front_infantry)
+    # 炮兵只在没有步兵和骑兵时才上前排
+    front_artillery = 0 if front_infantry + front_cavalry else min(counts["炮兵"], width)
+    back_artillery = min(counts["炮兵"] - front_artillery, width)
+
+    left_cavalry = front_cavalry // 2
+    front_order = (["骑兵"] * left_cavalry + ["步兵"] * front_infantry +
+                   ["炮兵"] * front_artillery + ["骑兵"] * (front_cavalry - left_cavalry))
+
+    def place(order):
+        row = [None] * width
+        start = (width - len(order)) // 2
+        for offset, category in enumerate(order):
+            row[start + offset] = (category, army['regiments'][category][0])
+        return row
+
+    return place(front_order), place(["炮兵"] * back_artillery)
+
+
+def _nearest(row, position, reach):
+    """找到 reach 格以内离指定位置最近的已占用位置（距离相同时取左侧），没有时返回 None"""
+    occupied = [p for p, slot in enumerate(row)
+                if slot is not None and abs(p - position) <= reach]
+    if not occupied:
+        return None
+    return min(occupied, key=lambda p: (abs(p - position), p))
+
+
+def _defended_values(front, back, position):
+    """前排团的属性，计入正后方炮兵提供的防御点数"""
+    values = list(front[position][1])
+    if back[position] is not None:
+        artillery = back[position][1]
+        for column in DEFENSIVE_COLUMNS:
+            values[column] += int(artillery[column] * BACKLINE_DEFENSE_SHARE)
+    return values
+
+
+def calculate(army_a, army_b, width=DEFAULT_WIDTH):
+    """计算两军全部团的一轮打击
+
+    每个团打击侧击范围（FLANKING_RANGE）内最近的敌方前排团，范围内没有敌人的团不参与。
+    返回 {'layout': {军: (前排, 后排)},
+          'hits': [{'attacker', 'row', 'position', 'target', 'category', 伤害...}, ...],
+          'totals': {军: {伤害类型: 合计}}}，
+    其中伤害为 fire_morale / fire_manpower / shock_morale / shock_manpower。
+    士气打击中固定的每日士气损失（0.01 × 平均最大士气）与团数无关，
+    不计入各团的 hits，只在 totals 中每军每种攻击类型计一次。
+    """
+    armies = {"A": army_a, "B": army_b}
+    rows = {side: layout(army, width) for side, army in armies.items()}
+
+    hits = []
+    attacker_values, defender_values, categories = [], [], []
+    attacker_params, defender_params = [], []
+    for side, enemy in (("A", "B"), ("B", "A")):
+        enemy_front, enemy_back = rows[enemy]
+        for row_name, row in zip(("front", "back"), rows[side]):
+            for position, slot in enumerate(row):
+                if slot is None:
+                    continue
+                category, values = slot
+                target = _nearest(enemy_front, position, FLANKING_RANGE[category])
+                if target is None:
+                    continue
+                hits.append({'attacker': side, 'row': row_name, 'position': position,
+                             'target': target, 'category': category})
+                attacker_values.append(values)
+                defender_values.append(_defended_values(enemy_front, enemy_back, target))
+                categories.append(category)
+                attacker_params.append(armies[side]['params'])
+                defender_params.append(armies[enemy]['params'])
+
+    totals = {side: {} for side in armies}
+    if hits:
+        attacker_columns = {name: [p[name] for p in attacker_params] for name in engine.PARAM_NAMES}
+        defender_columns = {name: [p[name] for p in defender_params] for name in engine.PARAM_NAMES}
+        for damage_type in engine.DAMAGE_TYPES:
+            morale, manpower = engine.damage_batch(attacker_values, defender_values,
+                                                   attacker_columns, defender_columns,
+                                                   damage_type, categories)
+            for hit, params, morale_damage, manpower_damage in zip(hits, attacker_params,
+                                                                   morale, manpower):
+                morale_damage -= 0.01 * params['avg_max_morale']
+                if hit['row'] == "back":
+                    morale_damage *= BACKLINE_ARTILLERY_FACTOR
+                    manpower_damage *= BACKLINE_ARTILLERY_FACTOR
+                # 防御点数高于进攻时公式可能为负，按0处理（与 battle.py 一致）
+                hit[f"{damage_type}_morale"] = max(morale_damage, 0.0)
+                hit[f"{damage_type}_manpower"] = max(manpower_damage, 0.0)
+
+    for side in armies:
+        attacking = any(hit['attacker'] == side for hit in hits)
+        drain = 0.01 * armies[side]['params']['avg_max_morale'] if attacking else 0.0
+        for damage_type in engine.DAMAGE_TYPES:
+            for result in ("morale", "manpower"):
+                column = f"{damage_type}_{result}"
+                totals[side][column] = sum(hit[column] for hit in hits if hit['attacker'] == side)
+            totals[side][f"{damage_type}_morale"] += drain
+
+    return {'layout': rows, 'hits': hits, 'totals': totals}
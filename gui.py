@@ -0,0 +1,747 @@
+"""军事打击计算器界面"""
+import queue
+import threading
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import ttk, messagebox
+import engine
+import profiling
+import unitdata
+
+LIVE_DEBOUNCE_MS = 200  # 停止输入多久后开始实时计算（毫秒）
+LIVE_POLL_MS = 20       # 检查后台计算结果的间隔（毫秒）
+
+# 对阵表格的列：(列名, 标题, 宽度)
+TABLE_COLUMNS = [
+    ("attacker", "攻击方", 220), ("defender", "防御方", 220), ("dice", "骰子", 50),
+    ("fire_morale", "火力士气", 90), ("fire_manpower", "火力人力", 90),
+    ("shock_morale", "冲击士气", 90), ("shock_manpower", "冲击人力", 90),
+]
+TABLE_DICE = range(10)     # 对阵表格计算的骰子点数
+TABLE_CHUNK_ROWS = 2000    # 后台每块计算的行数
+TABLE_APPLY_CHUNKS = 4     # 每次轮询最多并入表格的块数，避免界面卡顿
+
+
+def live_calculate(snapshot, targets):
+    """在后台线程中计算需要更新的结果
+
+    snapshot 为 {军: (单位属性, 兵种, 参数)}，targets 为 {(攻击方, 攻击类型), ...}，
+    返回 {(攻击方, 攻击类型): (士气打击, 人力打击) 或 None（无法计算）}。
+    """
+    results = {}
+    for army, damage_type in targets:
+        other = "B" if army == "A" else "A"
+        values, category, params = snapshot[army]
+        try:
+            results[(army, damage_type)] = engine.calculate_damage(
+                values, snapshot[other][0], params, snapshot[other][2], damage_type, category)
+        except ZeroDivisionError:
+            results[(army, damage_type)] = None
+    return results
+
+
+def matchup_rows(attackers, defenders, a_params, b_params, cancel, dice_values=TABLE_DICE,
+                 chunk_rows=TABLE_CHUNK_ROWS):
+    """在后台线程中按块生成对阵结果行
+
+    attackers / defenders 为 [(显示名称, 兵种, 属性), ...]，每行为
+    (攻击方, 防御方, 骰子, 火力士气, 火力人力, 冲击士气, 冲击人力)；cancel 被设置后停止生成。
+    """
+    dice_values = list(dice_values)
+    per_attacker = len(defenders) * len(dice_values)
+    if not per_attacker:
+        return
+    step = max(1, chunk_rows // per_attacker)
+    defender_labels = [label for label, _, _ in defenders for _ in dice_values]
+    defender_values = [values for _, _, values in defenders for _ in dice_values]
+    dice_column = dice_values * len(defenders)
+
+    for start in range(0, len(attackers), step):
+        if cancel.is_set():
+            return
+        block = attackers[start:start + step]
+        attacker_labels = [label for label, _, _ in block for _ in range(per_attacker)]
+        attacker_values = [values for _, _, values in block for _ in range(per_attacker)]
+        categories = [category for _, category, _ in block for _ in range(per_attacker)]
+        dice = dice_column * len(block)
+        params = dict(a_params, dice=dice)
+        fire = engine.damage_batch(attacker_values, defender_values * len(block), params,
+                                   b_params, "fire", categories)
+        shock = engine.damage_batch(attacker_values, defender_values * len(block), params,
+                                    b_params, "shock", categories)
+        yield list(zip(attacker_labels, defender_labels * len(block), dice,
+                       fire[0], fire[1], shock[0], shock[1]))
+
+
+def table_view(rows, count, sort_column, descending, text):
+    """在后台线程中计算表格的显示顺序（先按名称过滤再排序），返回行号列表"""
+    indices = range(count)
+    if text:
+        indices = [i for i in indices if text in rows[i][0] or text in rows[i][1]]
+    if sort_column is not None:
+        indices = sorted(indices, key=lambda i: rows[i][sort_column], reverse=descending)
+    return list(indices)
+
+
+class VirtualTable:
+    """虚拟化的结果表格
+
+    全部数据保存在 rows 列表中，Treeview 只创建可见的几行，
+    滚动时改写这几行的内容；排序和过滤在后台线程中计算显示顺序。
+    """
+
+    def __init__(self, root, parent, columns):
+        self.root = root
+        self.columns = columns
+        self.rows = []
+        self.order = None        # 过滤、排序后的行号，None 表示按原始顺序全部显示
+        self.offset = 0          # 第一可见行在显示顺序中的位置
+        self.items = []          # Treeview 中实际存在的行
+        self.sort_column = None
+        self.descending = False
+        self.filter_text = ""
+        self.view_generation = 0
+        self.view_busy = False
+        self.view_stale = False
+        self.view_results = queue.Queue()
+        self.view_executor = ThreadPoolExecutor(max_workers=1)
+
+        frame = ttk.Frame(parent)
+        frame.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(frame, columns=[name for name, _, _ in columns],
+                                 show="headings", height=10, selectmode="browse")
+        for index, (name, heading, width) in enumerate(columns):
+            self.tree.heading(name, text=heading, command=lambda index=index: self.sort_by(index))
+            self.tree.column(name, width=width, anchor=tk.W if index < 2 else tk.E)
+        self.scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=self.on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", lambda event: self.scroll_to(
+            self.offset + (-3 if event.delta > 0 else 3)))
+        self.tree.bind("<Button-4>", lambda event: self.scroll_to(self.offset - 3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll_to(self.offset + 3))
+        self.resize(10)
+
+    def size(self):
+        """显示的行数（过滤后）"""
+        return len(self.rows) if self.order is None else len(self.order)
+
+    def resize(self, visible):
+        """让 Treeview 中的行数与可见行数一致"""
+        while len(self.items) < visible:
+            self.items.append(self.tree.insert("", tk.END, values=()))
+        while len(self.items) > visible:
+            self.tree.delete(self.items.pop())
+        self.refresh()
+
+    def on_resize(self, event):
+        """窗口大小变化时按高度重新计算可见行数"""
+        try:
+            row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        except (tk.TclError, ValueError):
+            row_height = 20
+        self.resize(max(1, (event.height - row_height - 4) // row_height))
+
+    def refresh(self):
+        """改写可见行的内容并更新滚动条"""
+        size = self.size()
+        self.offset = max(0, min(self.offset, size - len(self.items)))
+        for k, item in enumerate(self.items):
+            position = self.offset + k
+            if position < size:
+                row = self.rows[position if self.order is None else self.order[position]]
+                values = row[:3] + tuple(f"{value:.2f}" for value in row[3:])
+            else:
+                values = ()
+            self.tree.item(item, values=values)
+        if size:
+            self.scrollbar.set(self.offset / size, min(1.0, (self.offset + len(self.items)) / size))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll_to(self, offset):
+        self.offset = int(offset)
+        self.refresh()
+
+    def on_scroll(self, action, amount, unit=None):
+        """滚动条回调：拖动（moveto）或按行/按页滚动（scroll）"""
+        if action == "moveto":
+            self.scroll_to(float(amount) * self.size())
+        elif action == "scroll":
+            step = len(self.items) if unit == "pages" else 1
+            self.scroll_to(self.offset + int(amount) * step)
+
+    def append(self, rows):
+        """追加数据行（数据可以在计算过程中分块流入）"""
+        self.rows.extend(rows)
+        if self.order is None:
+            self.refresh()
+        else:
+            self.request_view()
+
+    def clear(self):
+        """清空全部数据"""
+        self.rows = []
+        self.order = None if self.sort_column is None and not self.filter_text else []
+        self.offset = 0
+        self.view_generation += 1
+        self.refresh()
+
+    def sort_by(self, column):
+        """点击列标题排序，再次点击同一列时反向"""
+        if self.sort_column == column:
+            self.descending = not self.descending
+        else:
+            self.sort_column, self.descending = column, False
+        for index, (name, heading, _) in enumerate(self.columns):
+            mark = (" ▼" if self.descending else " ▲") if index == column else ""
+            self.tree.heading(name, text=heading + mark)
+        self.view_generation += 1
+        self.request_view()
+
+    def set_filter(self, text):
+        """只显示攻击方或防御方名称包含 text 的行"""
+        self.filter_text = text.strip()
+        self.view_generation += 1
+        self.request_view()
+
+    def request_view(self):
+        """重新计算显示顺序；后台正在计算时等它完成后再算一次"""
+        if self.sort_column is None and not self.filter_text:
+            self.order = None
+            self.refresh()
+        elif self.view_busy:
+            self.view_stale = True
+        else:
+            self.start_view()
+
+    def start_view(self):
+        self.view_busy = True
+        self.view_stale = False
+        generation = self.view_generation
+        future = self.view_executor.submit(table_view, self.rows, len(self.rows),
+                                           self.sort_column, self.descending, self.filter_text)
+        future.add_done_callback(lambda future: self.view_results.put((generation, future)))
+        self.root.after(LIVE_POLL_MS, self.apply_view)
+
+    def apply_view(self):
+        """把后台计算好的显示顺序应用到表格，过期的结果直接丢弃"""
+        try:
+            generation, future = self.view_results.get_nowait()
+        except queue.Empty:
+            self.root.after(LIVE_POLL_MS, self.apply_view)
+            return
+        self.view_busy = False
+        if generation == self.view_generation:
+            self.order = future.result()
+            self.refresh()
+        if self.view_stale:
+            self.start_view()
+
+    def close(self):
+        self.view_executor.shutdown(wait=False)
+
+
+class MilitaryDamageCalculator:
+    def __init__(self, root, data_files=("炮兵.txt",), tech_groups=None):
+        self.root = root
+        self.root.title("军事打击计算器")
+        self.root.geometry("1000x900")
+        
+        # 初始化数据结构
+        self.units = unitdata.UnitDB()
+        self.load_data(data_files, tech_groups)
+        
+        # 初始化参数（全部使用DoubleVar支持浮点）
+        self.init_parameters()
+        
+        # 创建紧凑界面
+        self.create_compact_ui()
+        
+        # 存储选中单位
+        self.selected_units = {"A": None, "B": None}
+        
+        # 实时计算：参数修改后防抖，只重算受影响的结果，计算在后台线程进行
+        self.live_dirty = set()
+        self.live_after_id = None
+        self.live_pending = 0
+        self.live_results = queue.Queue()
+        self.live_executor = ThreadPoolExecutor(max_workers=1)
+        self.bind_live_updates()
+        
+        # 对阵表格：后台线程分块计算，结果经队列流入表格
+        self.table_cancel = threading.Event()
+        self.table_chunks = queue.Queue()
+        self.table_executor = ThreadPoolExecutor(max_workers=1)
+        self.table_filter_after_id = None
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    @profiling.instrument("gui.load_data")
+    def load_data(self, filenames, tech_groups=None):
+        """加载数据文件（基础数据在前，模组在后），有错误的行逐行列出
+
+        tech_groups 为允许的科技组前缀，None 表示接受任何科技组。
+        """
+        errors = []
+        try:
+            self.units = unitdata.UnitDB.load(filenames, errors=errors, tech_groups=tech_groups)
+        except Exception as e:
+            messagebox.showerror("错误", f"数据加载错误: {str(e)}")
+        if errors:
+            self.show_data_errors(errors)
+
+    def show_data_errors(self, errors):
+        """在单独的窗口中列出数据文件的全部错误（文件、行号、原因）"""
+        window = tk.Toplevel(self.root)
+        window.title(f"数据文件错误（{len(errors)} 处，这些行已跳过）")
+        window.geometry("700x300")
+        scrollbar = ttk.Scrollbar(window, orient=tk.VERTICAL)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        text = tk.Text(window, wrap=tk.NONE, yscrollcommand=scrollbar.set)
+        text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.config(command=text.yview)
+        text.insert(tk.END, "\n".join(str(error) for error in errors))
+        text.config(state=tk.DISABLED)
+
+    def init_parameters(self):
+        """初始化所有参数变量（全部支持浮点）"""
+        self.params = {
+            army: {name: tk.DoubleVar(value=0.0) for name in engine.PARAM_NAMES}
+            for army in ("A", "B")
+        }
+
+    def create_compact_ui(self):
+        """创建紧凑的单面板界面"""
+        main_frame = ttk.Frame(self.root, padding=10)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # 单位选择区域
+        selection_frame = ttk.Frame(main_frame)
+        selection_frame.pack(fill=tk.X, pady=5)
+        
+        # A军选择
+        a_select_frame = ttk.LabelFrame(selection_frame, text="A军选择", padding=10)
+        a_select_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5)
+        self.create_unit_selection(a_select_frame, "A")
+        
+        # B军选择
+        b_select_frame = ttk.LabelFrame(selection_frame, text="B军选择", padding=10)
+        b_select_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5)
+        self.create_unit_selection(b_select_frame, "B")
+        
+        # 参数输入区域
+        param_frame = ttk.Frame(main_frame)
+        param_frame.pack(fill=tk.X, pady=5)
+        
+        # A军参数
+        a_param_frame = ttk.LabelFrame(param_frame, text="A军参数", padding=10)
+        a_param_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5)
+        self.create_parameter_inputs(a_param_frame, "A")
+        
+        # B军参数
+        b_param_frame = ttk.LabelFrame(param_frame, text="B军参数", padding=10)
+        b_param_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5)
+        self.create_parameter_inputs(b_param_frame, "B")
+        
+        # 计算按钮（只在A军参数区域下方添加一个）
+        btn_frame = ttk.Frame(param_frame)
+        btn_frame.pack(side=tk.LEFT, fill=tk.Y, padx=5)
+        ttk.Button(btn_frame, text="开始计算", command=self.calculate_all, 
+                  width=15).pack(pady=10, padx=5)
+        
+        # 结果区域
+        result_frame = ttk.LabelFrame(main_frame, text="计算结果", padding=10)
+        result_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+        self.create_results_display(result_frame)
+        
+        # 对阵表格区域
+        table_frame = ttk.LabelFrame(main_frame, text="全部对阵", padding=10)
+        table_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+        self.create_matchup_table(table_frame)
+
+    def create_unit_selection(self, parent, army):
+        """创建单位选择组件（属性显示在右侧）"""
+        main_frame = ttk.Frame(parent)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # 左侧选择框架
+        select_frame = ttk.Frame(main_frame)
+        select_frame.pack(side=tk.LEFT, fill=tk.Y, padx=5)
+        
+        # 兵种选择
+        ttk.Label(select_frame, text="兵种:").grid(row=0, column=0, sticky=tk.W)
+        category_var = tk.StringVar()
+        category_cb = ttk.Combobox(select_frame, textvariable=category_var, 
+                                  values=self.units.categories, state="readonly", width=12)
+        category_cb.grid(row=0, column=1, sticky=tk.EW, padx=5, pady=2)
+        setattr(self, f"{army}_category_var", category_var)
+        setattr(self, f"{army}_category_cb", category_cb)
+        category_cb.bind("<<ComboboxSelected>>", lambda e: self.on_category_select(army))
+        
+        # 科技组选择
+        ttk.Label(select_frame, text="科技组:").grid(row=1, column=0, sticky=tk.W)
+        tech_group_var = tk.StringVar()
+        tech_group_cb = ttk.Combobox(select_frame, textvariable=tech_group_var, state="readonly", width=12)
+        tech_group_cb.grid(row=1, column=1, sticky=tk.EW, padx=5, pady=2)
+        setattr(self, f"{army}_tech_group_var", tech_group_var)
+        setattr(self, f"{army}_tech_group_cb", tech_group_cb)
+        tech_group_cb.bind("<<ComboboxSelected>>", lambda e: self.on_tech_group_select(army))
+        
+        # 科技等级选择
+        ttk.Label(select_frame, text="科技等级:").grid(row=2, column=0, sticky=tk.W)
+        tech_level_var = tk.StringVar()
+        tech_level_cb = ttk.Combobox(select_frame, textvariable=tech_level_var, state="readonly", width=12)
+        tech_level_cb.grid(row=2, column=1, sticky=tk.EW, padx=5, pady=2)
+        setattr(self, f"{army}_tech_level_var", tech_level_var)
+        setattr(self, f"{army}_tech_level_cb", tech_level_cb)
+        tech_level_cb.bind("<<ComboboxSelected>>", lambda e: self.on_tech_level_select(army))
+        
+        # 单位选择
+        ttk.Label(select_frame, text="单位名称:").grid(row=3, column=0, sticky=tk.W)
+        unit_var = tk.StringVar()
+        unit_cb = ttk.Combobox(select_frame, textvariable=unit_var, state="readonly", width=12)
+        unit_cb.grid(row=3, column=1, sticky=tk.EW, padx=5, pady=2)
+        setattr(self, f"{army}_unit_var", unit_var)
+        setattr(self, f"{army}_unit_cb", unit_cb)
+        unit_cb.bind("<<ComboboxSelected>>", lambda e: self.on_unit_select(army))
+        
+        # 右侧属性框架
+        attr_frame = ttk.LabelFrame(main_frame, text="单位属性", padding=10)
+        attr_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=5)
+        
+        for i, attr in enumerate(engine.ATTRIBUTES):
+            ttk.Label(attr_frame, text=f"{attr}:").grid(row=i, column=0, sticky=tk.W, padx=2, pady=1)
+            label = ttk.Label(attr_frame, text="", width=6)
+            label.grid(row=i, column=1, sticky=tk.W, padx=2, pady=1)
+            setattr(self, f"{army}_{attr}_label", label)
+        
+        ttk.Label(attr_frame, text="总和:").grid(row=6, column=0, sticky=tk.W, padx=2, pady=1)
+        total_label = ttk.Label(attr_frame, text="", width=8)
+        total_label.grid(row=6, column=1, sticky=tk.W, padx=2, pady=1)
+        setattr(self, f"{army}_total_label", total_label)
+
+    def create_parameter_inputs(self, parent, army):
+        """创建参数输入组件"""
+        # 第一列参数
+        col1 = ttk.Frame(parent)
+        col1.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        self.create_param_row(col1, 0, "士气打击加成:", army, "morale_impact_bonus")
+        self.create_param_row(col1, 1, "士气打击减成:", army, "morale_impact_reduction")
+        self.create_param_row(col1, 2, "最大士气:", army, "max_morale")
+        self.create_param_row(col1, 3, "平均士气:", army, "avg_max_morale")
+        self.create_param_row(col1, 4, "冲击伤害加成:", army, "shock_damage_bonus")
+        self.create_param_row(col1, 5, "火力伤害加成:", army, "fire_damage_bonus")
+        
+        # 第二列参数
+        col2 = ttk.Frame(parent)
+        col2.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        self.create_param_row(col2, 0, "冲击伤害减成:", army, "shock_damage_reduction")
+        self.create_param_row(col2, 1, "火力伤害减成:", army, "fire_damage_reduction")
+        self.create_param_row(col2, 2, "骰子:", army, "dice")
+        self.create_param_row(col2, 3, "骰子修正:", army, "dice_modifier")
+        self.create_param_row(col2, 4, "团人数(K):", army, "unit_count")
+        self.create_param_row(col2, 5, "冲击值:", army, "shock_value")
+        
+        # 第三列参数
+        col3 = ttk.Frame(parent)
+        col3.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        self.create_param_row(col3, 0, "火力值:", army, "fire_value")
+        self.create_param_row(col3, 1, "步兵作战加成:", army, "infantry_combat_bonus")
+        self.create_param_row(col3, 2, "骑兵作战加成:", army, "cavalry_combat_bonus")
+        self.create_param_row(col3, 3, "炮兵作战加成:", army, "artillery_combat_bonus")
+        self.create_param_row(col3, 4, "训练度:", army, "training")
+        self.create_param_row(col3, 5, "时间:", army, "time")
+        self.create_param_row(col3, 6, "军事战术:", army, "military_tactics")
+
+    def create_param_row(self, parent, row, label, army, param_name):
+        """创建单个参数输入行"""
+        ttk.Label(parent, text=label).grid(row=row, column=0, sticky=tk.W, padx=2, pady=1)
+        ttk.Entry(parent, textvariable=self.params[army][param_name], width=8).grid(
+            row=row, column=1, sticky=tk.W, padx=2, pady=1)
+
+    def create_results_display(self, parent):
+        """创建结果展示区域"""
+        # 火力打击结果
+        fire_frame = ttk.LabelFrame(parent, text="火力打击", padding=5)
+        fire_frame.pack(fill=tk.X, pady=2)
+        
+        self.create_result_row(fire_frame, 0, "A军士气打击:", "a_fire_morale")
+        self.create_result_row(fire_frame, 1, "B军士气打击:", "b_fire_morale")
+        self.create_result_row(fire_frame, 2, "A军人力打击:", "a_fire_manpower")
+        self.create_result_row(fire_frame, 3, "B军人力打击:", "b_fire_manpower")
+        
+        # 冲击打击结果
+        shock_frame = ttk.LabelFrame(parent, text="冲击打击", padding=5)
+        shock_frame.pack(fill=tk.X, pady=2)
+        
+        self.create_result_row(shock_frame, 0, "A军士气打击:", "a_shock_morale")
+        self.create_result_row(shock_frame, 1, "B军士气打击:", "b_shock_morale")
+        self.create_result_row(shock_frame, 2, "A军人力打击:", "a_shock_manpower")
+        self.create_result_row(shock_frame, 3, "B军人力打击:", "b_shock_manpower")
+
+    def create_result_row(self, parent, row, label, result_name):
+        """创建单个结果展示行"""
+        ttk.Label(parent, text=label).grid(row=row, column=0, sticky=tk.W, padx=2, pady=1)
+        label = ttk.Label(parent, text="", width=10)
+        label.grid(row=row, column=1, sticky=tk.W, padx=2, pady=1)
+        setattr(self, f"{result_name}_label", label)
+
+    def create_matchup_table(self, parent):
+        """创建对阵表格（A军已选范围内的单位攻击B军已选范围内的单位）"""
+        toolbar = ttk.Frame(parent)
+        toolbar.pack(fill=tk.X, pady=2)
+        ttk.Button(toolbar, text="计算全部对阵", command=self.start_matchup_table,
+                   width=15).pack(side=tk.LEFT, padx=2)
+        ttk.Label(toolbar, text="筛选:").pack(side=tk.LEFT, padx=(10, 2))
+        self.table_filter_var = tk.StringVar()
+        ttk.Entry(toolbar, textvariable=self.table_filter_var, width=20).pack(side=tk.LEFT)
+        self.table_filter_var.trace_add("write", lambda *_: self.schedule_table_filter())
+        self.table_status_label = ttk.Label(toolbar, text="")
+        self.table_status_label.pack(side=tk.LEFT, padx=10)
+        
+        self.table = VirtualTable(self.root, parent, TABLE_COLUMNS)
+
+    def schedule_table_filter(self):
+        """筛选条件停止输入一段时间后再过滤（防抖）"""
+        if self.table_filter_after_id is not None:
+            self.root.after_cancel(self.table_filter_after_id)
+        self.table_filter_after_id = self.root.after(
+            LIVE_DEBOUNCE_MS, lambda: self.table.set_filter(self.table_filter_var.get()))
+
+    def matchup_candidates(self, army):
+        """该军已选的兵种/科技组/科技等级范围内的全部单位，未选择时为全部单位"""
+        selected = [getattr(self, f"{army}_{field}_var").get()
+                    for field in ("category", "tech_group", "tech_level")]
+        units = []
+        for i in range(len(self.units)):
+            key = self.units.key(i)
+            if all(not value or value == key[k] for k, value in enumerate(selected)):
+                units.append((f"{key[1]} {key[2]} {key[3]}", key[0], self.units.values(i)))
+        return units
+
+    def start_matchup_table(self):
+        """在后台计算全部对阵，结果分块流入表格"""
+        try:
+            a_params, b_params = self.read_params("A"), self.read_params("B")
+        except (tk.TclError, ValueError) as e:
+            messagebox.showerror("计算错误", f"参数错误: {str(e)}")
+            return
+        attackers, defenders = self.matchup_candidates("A"), self.matchup_candidates("B")
+        
+        # 取消上一次未完成的计算，它已放入队列的结果会被丢弃
+        self.table_cancel.set()
+        self.table_cancel = cancel = threading.Event()
+        self.table.clear()
+        self.table_status_label.config(
+            text=f"计算中: 0 / {len(attackers) * len(defenders) * len(TABLE_DICE)}")
+        self.table_executor.submit(self.produce_matchup_rows, attackers, defenders,
+                                   a_params, b_params, cancel)
+        self.root.after(LIVE_POLL_MS, self.apply_matchup_rows, cancel,
+                        len(attackers) * len(defenders) * len(TABLE_DICE))
+
+    def produce_matchup_rows(self, attackers, defenders, a_params, b_params, cancel):
+        """后台线程：计算对阵结果并放入队列，最后放入 None 或错误信息"""
+        try:
+            for chunk in matchup_rows(attackers, defenders, a_params, b_params, cancel):
+                self.table_chunks.put((cancel, chunk))
+            self.table_chunks.put((cancel, None))
+        except ZeroDivisionError:
+            self.table_chunks.put((cancel, "除数为0（请检查军事战术）"))
+
+    def apply_matchup_rows(self, cancel, total):
+        """把后台算好的结果并入表格，每次只并入有限的块数以保持界面响应"""
+        if cancel is not self.table_cancel:
+            return  # 已开始新的计算
+        for _ in range(TABLE_APPLY_CHUNKS):
+            try:
+                owner, chunk = self.table_chunks.get_nowait()
+            except queue.Empty:
+                break
+            if owner is not cancel:
+                continue
+            if chunk is None or isinstance(chunk, str):
+                self.table_status_label.config(
+                    text=chunk or f"共 {len(self.table.rows)} 行")
+                return
+            self.table.append(chunk)
+        self.table_status_label.config(text=f"计算中: {len(self.table.rows)} / {total}")
+        self.root.after(LIVE_POLL_MS, self.apply_matchup_rows, cancel, total)
+
+    def on_close(self):
+        """关闭窗口时停止后台计算"""
+        self.table_cancel.set()
+        self.table.close()
+        self.table_executor.shutdown(wait=False)
+        self.live_executor.shutdown(wait=False)
+        self.root.destroy()
+
+    @profiling.instrument("gui.on_category_select")
+    def on_category_select(self, army):
+        """兵种选择事件"""
+        category = getattr(self, f"{army}_category_var").get()
+        tech_group_cb = getattr(self, f"{army}_tech_group_cb")
+        
+        if category in self.units.groups:
+            tech_group_cb['values'] = self.units.groups[category]
+            tech_group_cb.set('')
+            getattr(self, f"{army}_tech_level_cb")['values'] = []
+            getattr(self, f"{army}_tech_level_var").set('')
+            getattr(self, f"{army}_unit_cb")['values'] = []
+            getattr(self, f"{army}_unit_var").set('')
+            self.clear_unit_attributes(army)
+
+    @profiling.instrument("gui.on_tech_group_select")
+    def on_tech_group_select(self, army):
+        """科技组选择事件"""
+        category = getattr(self, f"{army}_category_var").get()
+        tech_group = getattr(self, f"{army}_tech_group_var").get()
+        tech_level_cb = getattr(self, f"{army}_tech_level_cb")
+        
+        tech_levels = self.units.levels.get((category, tech_group))
+        if tech_levels is not None:
+            tech_level_cb['values'] = tech_levels
+            tech_level_cb.set('')
+            getattr(self, f"{army}_unit_cb")['values'] = []
+            getattr(self, f"{army}_unit_var").set('')
+            self.clear_unit_attributes(army)
+
+    @profiling.instrument("gui.on_tech_level_select")
+    def on_tech_level_select(self, army):
+        """科技等级选择事件"""
+        category = getattr(self, f"{army}_category_var").get()
+        tech_group = getattr(self, f"{army}_tech_group_var").get()
+        tech_level = getattr(self, f"{army}_tech_level_var").get()
+        unit_cb = getattr(self, f"{army}_unit_cb")
+        
+        if (category, tech_group) in self.units.levels:
+            unit_names = [self.units.unit_name[i]
+                          for i in self.units.units_at(category, tech_group, tech_level)]
+            unit_cb['values'] = unit_names
+            unit_cb.set('')
+            self.clear_unit_attributes(army)
+
+    @profiling.instrument("gui.on_unit_select")
+    def on_unit_select(self, army):
+        """单位选择事件"""
+        category = getattr(self, f"{army}_category_var").get()
+        tech_group = getattr(self, f"{army}_tech_group_var").get()
+        tech_level = getattr(self, f"{army}_tech_level_var").get()
+        unit_name = getattr(self, f"{army}_unit_var").get()
+        
+        if not all([category, tech_group, tech_level, unit_name]):
+            return
+        
+        unit_id = self.units.find(category, tech_group, tech_level, unit_name)
+        if unit_id is not None:
+            unit_data = self.units.unit(unit_id)
+            self.selected_units[army] = unit_data
+            attributes = unit_data['values']
+            for i, attr in enumerate(engine.ATTRIBUTES):
+                getattr(self, f"{army}_{attr}_label").config(text=str(attributes[i]))
+            getattr(self, f"{army}_total_label").config(text=str(unit_data['total']))
+            
+            # 换了单位，该军作为攻击方和防御方的结果都要重算
+            self.schedule_live_update({(side, damage_type) for side in ("A", "B")
+                                       for damage_type in engine.DAMAGE_TYPES})
+
+    def bind_live_updates(self):
+        """参数变化时自动重算受影响的结果"""
+        for army, params in self.params.items():
+            for name, var in params.items():
+                targets = engine.dependent_results(army, name)
+                var.trace_add("write", lambda *_, targets=targets: self.schedule_live_update(targets))
+
+    def schedule_live_update(self, targets):
+        """记录需要重算的结果，停止输入一段时间后再计算（防抖）"""
+        self.live_dirty |= targets
+        if self.live_after_id is not None:
+            self.root.after_cancel(self.live_after_id)
+        self.live_after_id = self.root.after(LIVE_DEBOUNCE_MS, self.start_live_update)
+
+    def start_live_update(self):
+        """在主线程读取参数快照，把计算交给后台线程"""
+        self.live_after_id = None
+        if not self.live_dirty or not self.selected_units["A"] or not self.selected_units["B"]:
+            return
+        try:
+            snapshot = {army: (self.selected_units[army]['values'],
+                               getattr(self, f"{army}_category_var").get(),
+                               self.read_params(army))
+                        for army in ("A", "B")}
+        except (tk.TclError, ValueError):
+            return  # 输入尚未完成（如空白或只有负号），等下一次修改再算
+        
+        targets, self.live_dirty = self.live_dirty, set()
+        # 单线程执行器按提交顺序完成，结果按顺序放入队列，后提交的结果总会覆盖先提交的
+        future = self.live_executor.submit(live_calculate, snapshot, targets)
+        future.add_done_callback(self.live_results.put)
+        self.live_pending += 1
+        if self.live_pending == 1:
+            self.root.after(LIVE_POLL_MS, self.apply_live_results)
+
+    def apply_live_results(self):
+        """把后台计算完成的结果写入界面"""
+        while True:
+            try:
+                future = self.live_results.get_nowait()
+            except queue.Empty:
+                break
+            self.live_pending -= 1
+            if not self.selected_units["A"] or not self.selected_units["B"]:
+                continue  # 计算期间有一方的单位被清空，丢弃过时的结果
+            for (army, damage_type), result in future.result().items():
+                morale, manpower = result if result is not None else (None, None)
+                getattr(self, f"{army.lower()}_{damage_type}_morale_label").config(
+                    text="-" if morale is None else f"{morale:.2f}")
+                getattr(self, f"{army.lower()}_{damage_type}_manpower_label").config(
+                    text="-" if manpower is None else f"{manpower:.2f}")
+        if self.live_pending:
+            self.root.after(LIVE_POLL_MS, self.apply_live_results)
+
+    def clear_unit_attributes(self, army):
+        """清空单位属性显示"""
+        for attr in engine.ATTRIBUTES:
+            getattr(self, f"{army}_{attr}_label").config(text="")
+        getattr(self, f"{army}_total_label").config(text="")
+        self.selected_units[army] = None
+        # 结果对应的对阵已不存在
+        for column in engine.RESULT_COLUMNS:
+            getattr(self, f"{column}_label").config(text="-")
+
+    def read_params(self, army):
+        """读取某一方的全部参数"""
+        return {name: var.get() for name, var in self.params[army].items()}
+
+    def calculate_all(self):
+        """执行所有计算"""
+        try:
+            if not self.selected_units["A"] or not self.selected_units["B"]:
+                raise ValueError("请先选择双方单位")
+            
+            # 一次读取双方参数，双方互相打击的全部结果在同一批中计算
+            results = engine.mutual_damage(
+                [self.selected_units["A"]['values']], [self.selected_units["B"]['values']],
+                self.read_params("A"), self.read_params("B"),
+                self.A_category_var.get(), self.B_category_var.get())
+            
+            # 更新结果
+            for column in engine.RESULT_COLUMNS:
+                getattr(self, f"{column}_label").config(text=f"{results[column][0]:.2f}")
+            
+        except Exception as e:
+            messagebox.showerror("计算错误", f"计算过程中出错: {str(e)}")
+
+    def calculate_damage(self, attacker, defender, damage_type):
+        """计算伤害值"""
+        if not self.selected_units[attacker] or not self.selected_units[defender]:
+            raise ValueError("请先选择双方单位")
+        
+        category = getattr(self, f"{attacker}_category_var").get()
+        return engine.calculate_damage(
+            self.selected_units[attacker]['values'], self.selected_units[defender]['values'],
+            self.read_params(attacker), self.read_params(defender), damage_type, category)
@@ -0,0 +1,194 @@
+"""全兵种对战矩阵（预计算所有攻防组合并缓存到磁盘）"""
+import hashlib
+import json
+import mmap
+import os
+from array import array
+
+import engine
+import profiling
+import unitdata
+
+DAMAGE_TYPES = ("fire", "shock")
+DICE = range(10)
+RESULTS = ("morale", "manpower")
+
+# 缓存格式版本，格式变化时递增使旧缓存失效
+CACHE_VERSION = 1
+
+# 缓存目录中最多保留的矩阵个数（每个数 MB），超出时删除最久未使用的
+MAX_CACHED_MATRICES = 4
+
+
+def cache_key(filenames, attacker_params, defender_params):
+    """由各数据文件内容（按合并顺序）和修正参数计算缓存键（骰子由矩阵维度覆盖，不参与）"""
+    digest = hashlib.sha256()
+    for filename in filenames:
+        with open(filename, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 16), b''):
+                digest.update(chunk)
+        digest.update(b'\0')
+    modifiers = [
+        {name: float(value) for name, value in params.items() if name != 'dice'}
+        for params in (attacker_params, defender_params)
+    ]
+    digest.update(json.dumps([CACHE_VERSION, modifiers], sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()[:24]
+
+
+@profiling.instrument("matrix.build_values")
+def build_values(db, attacker_params, defender_params):
+    """计算完整张量，返回 (单位键列表, float32 数组)
+
+    张量形状为 (攻击类型, 攻击方, 防御方, 骰子, 士气/人力)。
+    伤害对骰子是线性的，因此每种攻击类型只需计算骰子为0和1两批。
+    """
+    n = len(db)
+    keys = [db.key(i) for i in range(n)]
+    units = [db.values(i) for i in range(n)]
+
+    attacker_values = [values for values in units for _ in range(n)]
+    defender_values = units * n
+    categories = [key[0] for key in keys for _ in range(n)]
+
+    values = array('f')
+    for damage_type in DAMAGE_TYPES:
+        morale0, manpower0 = engine.damage_batch(
+            attacker_values, defender_values,
+            dict(attacker_params, dice=0), defender_params, damage_type, categories)
+        morale1, manpower1 = engine.damage_batch(
+            attacker_values, defender_values,
+            dict(attacker_params, dice=1), defender_params, damage_type, categories)
+        for m0, m1, p0, p1 in zip(morale0, morale1, manpower0, manpower1):
+            morale_step = m1 - m0
+            manpower_step = p1 - p0
+            for dice in DICE:
+                values.append(m0 + dice * morale_step)
+                values.append(p0 + dice * manpower_step)
+    return keys, values
+
+
+class MatchupMatrix:
+    """对战矩阵：按 (攻击类型, 攻击方, 防御方, 骰子, 士气/人力) 索引的 float32 张量"""
+
+    def __init__(self, keys, values, source=None):
+        self.keys = [tuple(key) for key in keys]
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        self.values = values
+        self._source = source
+        expected = len(DAMAGE_TYPES) * len(self.keys) ** 2 * len(DICE) * len(RESULTS)
+        if len(values) != expected:
+            raise ValueError(f"矩阵大小不符: {len(values)} != {expected}")
+
+    @classmethod
+    def load_or_build(cls, filenames, attacker_params, defender_params=None, cache_dir=None):
+        """读取缓存的矩阵（内存映射），缓存缺失或失效时重新计算并写入
+
+        filenames 可以是单个文件名或按合并顺序排列的文件名列表（同 UnitDB.load），
+        defender_params 缺省时双方使用同一组修正。
+        缓存目录中只保留最近使用的 MAX_CACHED_MATRICES 个矩阵。
+        """
+        if isinstance(filenames, str):
+            filenames = [filenames]
+        if defender_params is None:
+            defender_params = attacker_params
+        cache_dir = cache_dir or unitdata.default_cache_dir(filenames[0])
+        key = cache_key(filenames, attacker_params, defender_params)
+        header_path = os.path.join(cache_dir, f"matchup-{key}.json")
+        data_path = os.path.join(cache_dir, f"matchup-{key}.bin")
+
+        if os.path.exists(header_path) and os.path.exists(data_path):
+            os.utime(header_path)  # 记录使用时间，供清理时判断
+        else:
+            keys, values = build_values(unitdata.UnitDB.load(filenames, cache_dir),
+                                        attacker_params, defender_params)
+            os.makedirs(cache_dir, exist_ok=True)
+            # 先写临时文件再替换，避免中断时留下不完整的缓存
+            with open(data_path + ".tmp", 'wb') as file:
+                values.tofile(file)
+            os.replace(data_path + ".tmp", data_path)
+            with open(header_path + ".tmp", 'w', encoding='utf-8') as file:
+                json.dump({'version': CACHE_VERSION, 'typecode': values.typecode,
+                           'itemsize': values.itemsize, 'units': keys},
+                          file, ensure_ascii=False)
+            os.replace(header_path + ".tmp", header_path)
+            _prune_cache(cache_dir, MAX_CACHED_MATRICES)
+
+        return cls.open(header_path, data_path)
+
+    @classmethod
+    def open(cls, header_path, data_path):
+        """以内存映射方式打开已缓存的矩阵"""
+        with open(header_path, 'r', encoding='utf-8') as file:
+            header = json.load(file)
+        if header['itemsize'] != array(header['typecode']).itemsize:
+            raise ValueError("缓存文件与当前平台不兼容")
+        with open(data_path, 'rb') as file:
+            source = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        values = memoryview(source).cast(header['typecode'])
+        return cls(header['units'], values, source)
+
+    def close(self):
+        """释放内存映射"""
+        if self._source is not None:
+            self.values.release()
+            self._source.close()
+            self._source = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _offset(self, damage_type, attacker, defender, dice):
+        """计算 (攻击类型, 攻击方, 防御方, 骰子) 对应的起始下标"""
+        if damage_type not in DAMAGE_TYPES:
+            raise ValueError(f"未知的攻击类型: {damage_type}")
+        if dice not in DICE:
+            raise ValueError(f"骰子点数应在 {DICE.start} 到 {DICE.stop - 1} 之间: {dice}")
+        n = len(self.keys)
+        t = DAMAGE_TYPES.index(damage_type)
+        return ((((t * n) + attacker) * n + defender) * len(DICE) + dice) * len(RESULTS)
+
+    def lookup(self, attacker, defender, damage_type, dice):
+        """查询单个组合，返回 (士气打击, 人力打击)"""
+        offset = self._offset(damage_type, self.index[tuple(attacker)],
+                              self.index[tuple(defender)], dice)
+        return self.values[offset], self.values[offset + 1]
+
+    def best_against(self, defender, damage_type="fire", dice=5, result="manpower",
+                     category=None, tech_group=None, tech_level=None):
+        """列出对指定防御方伤害最高的攻击方，返回按伤害降序的 [(单位键, 伤害), ...]
+
+        给出 tech_level 时只列出该科技等级已可用（科技等级不高于它）的单位。
+        """
+        target = self.index[tuple(defender)]
+        if result not in RESULTS:
+            raise ValueError(f"未知的结果类型: {result}")
+        self._offset(damage_type, 0, target, dice)  # 先检查攻击类型和骰子
+        column = RESULTS.index(result)
+        ranked = []
+        for i, key in enumerate(self.keys):
+            if category is not None and key[0] != category:
+                continue
+            if tech_group is not None and key[1] != tech_group:
+                continue
+            if tech_level is not None and int(key[2]) > tech_level:
+                continue
+            ranked.append((key, self.values[self._offset(damage_type, i, target, dice) + column]))
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked
+
+
+def _prune_cache(cache_dir, keep):
+    """删除最久未使用的矩阵缓存，只保留 keep 个"""
+    headers = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+               if name.startswith("matchup-") and name.endswith(".json")]
+    headers.sort(key=os.path.getmtime, reverse=True)
+    for header_path in headers[keep:]:
+        for path in (header_path, header_path[:-len(".json")] + ".bin"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # 其他进程正在使用（Windows 上映射中的文件不能删除）或已被删除
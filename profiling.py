@@ -0,0 +1,87 @@
+"""可选的热点计时与计数（默认关闭）
+
+设置环境变量 EU4_PROFILE=统计文件.json 后运行程序（或在代码中调用 enable()），
+被 instrument 包装的函数会记录调用次数、总耗时和最长耗时，count() 记录自定义计数，
+程序退出时写出 JSON（也可随时调用 dump()）。关闭时包装函数只多一次标志判断。
+"""
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+
+_enabled = False
+_lock = threading.Lock()  # 界面的后台线程也会调用热点函数
+_timers = {}              # 名称 -> [调用次数, 总耗时, 最长耗时]
+_counters = {}            # 名称 -> 计数
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """清空已记录的统计"""
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def instrument(name):
+    """装饰器：开启统计时记录函数的调用次数和耗时"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with _lock:
+                    timer = _timers.setdefault(name, [0, 0.0, 0.0])
+                    timer[0] += 1
+                    timer[1] += elapsed
+                    timer[2] = max(timer[2], elapsed)
+        return wrapper
+    return decorator
+
+
+def count(name, amount=1):
+    """开启统计时累加计数（如计算的行数、解析的单位数）"""
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + amount
+
+
+def snapshot():
+    """返回当前统计 {'timers': {名称: {...}}, 'counters': {名称: 计数}}"""
+    with _lock:
+        timers = {name: {'calls': calls, 'total': total, 'max': longest,
+                         'mean': total / calls if calls else 0.0}
+                  for name, (calls, total, longest) in _timers.items()}
+        return {'timers': timers, 'counters': dict(_counters)}
+
+
+def dump(path):
+    """把统计写入 JSON 文件"""
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(snapshot(), file, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+_profile_path = os.environ.get("EU4_PROFILE")
+if _profile_path:
+    enable()
+    atexit.register(dump, _profile_path)
@@ -0,0 +1,134 @@
+"""科技进程排名索引：每个兵种、科技组在每个科技等级可选的最佳单位
+
+评分为对参考对手集合的平均净伤害（造成的伤害减去受到的伤害，火力与冲击平均）。
+评分随六项点数单调不减，因此先剔除被支配的单位：若存在科技等级不高于它、
+六项点数都不低于它的另一单位，它在任何科技等级都不可能更好，无需评估。
+"""
+import engine
+
+MAX_TECH_LEVEL = 32
+
+
+def dominates(a, b):
+    """点数 a 是否支配点数 b（每项都不低，且不完全相同）"""
+    return a != b and all(x >= y for x, y in zip(a, b))
+
+
+def pareto_frontier(db, ids):
+    """剔除被同级或更低级单位支配的单位，返回剩余的单位编号"""
+    frontier = []
+    for i in ids:
+        values = db.values(i)
+        level = db.unit_level[i]
+        dominated = False
+        for j in ids:
+            if j == i or db.unit_level[j] > level:
+                continue
+            other = db.values(j)
+            # 点数完全相同时保留等级更低（同级则编号更小）的一个
+            if dominates(other, values) or (other == values and
+                                            (db.unit_level[j], j) < (level, i)):
+                dominated = True
+                break
+        if not dominated:
+            frontier.append(i)
+    return frontier
+
+
+class RankingIndex:
+    """科技进程排名索引
+
+    opponents 为参考对手（单位库中的单位记录），attacker_params 为候选单位一方的参数，
+    opponent_params 为对手一方的参数（缺省时相同），metric 为 "morale" 或 "manpower"。
+    调用 refresh(db) 建立或更新索引，只有数据变化过的科技组会重新计算。
+    """
+
+    def __init__(self, opponents, attacker_params, opponent_params=None, metric="morale",
+                 max_level=MAX_TECH_LEVEL):
+        if metric not in ("morale", "manpower"):
+            raise ValueError(f"未知的评分类型: {metric}")
+        self.opponents = [(list(unit['values']), unit.category) for unit in opponents]
+        self.attacker_params = dict(attacker_params)
+        self.opponent_params = dict(opponent_params or attacker_params)
+        self.metric = metric
+        self.max_level = max_level
+        self.groups = {}  # (兵种, 科技组) -> {'fingerprint', 'frontier', 'scores', 'best'}
+
+    @staticmethod
+    def fingerprint(db, ids):
+        """科技组数据的指纹，用于判断是否需要重算"""
+        return tuple((db.unit_level[i], db.unit_name[i], tuple(db.values(i))) for i in ids)
+
+    def refresh(self, db):
+        """按单位库更新索引，返回重新计算过的 (兵种, 科技组) 集合"""
+        current = {}
+        for category, groups in db.groups.items():
+            for tech_group in groups:
+                ids = [i for level in db.levels[(category, tech_group)]
+                       for i in db.units_at(category, tech_group, level)]
+                current[(category, tech_group)] = ids
+
+        for key in set(self.groups) - set(current):
+            del self.groups[key]
+
+        recomputed = set()
+        for key, ids in current.items():
+            fingerprint = self.fingerprint(db, ids)
+            entry = self.groups.get(key)
+            if entry is not None and entry['fingerprint'] == fingerprint:
+                continue
+            self.groups[key] = self._build_group(db, key[0], ids, fingerprint)
+            recomputed.add(key)
+        return recomputed
+
+    def _build_group(self, db, category, ids, fingerprint):
+        """评估一个科技组的帕累托前沿，并求出每个科技等级的最佳单位"""
+        frontier = pareto_frontier(db, ids)
+        scores = self.score(db, frontier, category)
+
+        best = [None] * (self.max_level + 1)
+        leader = None
+        ranked = sorted(zip(frontier, scores), key=lambda item: (db.unit_level[item[0]], item[0]))
+        k = 0
+        for level in range(self.max_level + 1):
+            while k < len(ranked) and db.unit_level[ranked[k][0]] <= level:
+                if leader is None or ranked[k][1] > leader[1]:
+                    leader = (db.key(ranked[k][0]), ranked[k][1])
+                k += 1
+            best[level] = leader
+
+        return {'fingerprint': fingerprint,
+                'frontier': [db.key(i) for i in frontier],
+                'scores': {db.key(i): score for i, score in zip(frontier, scores)},
+                'best': best}
+
+    def score(self, db, ids, category):
+        """批量计算候选单位对参考对手的平均净伤害"""
+        if not ids or not self.opponents:
+            return [0.0] * len(ids)
+        candidates = [db.values(i) for i in ids]
+        n = len(self.opponents)
+        own = [values for values in candidates for _ in range(n)]
+        enemy = [values for values, _ in self.opponents] * len(candidates)
+        enemy_categories = [category for _, category in self.opponents] * len(candidates)
+        column = 0 if self.metric == "morale" else 1
+
+        net = [0.0] * len(own)
+        for damage_type in engine.DAMAGE_TYPES:
+            dealt = engine.damage_batch(own, enemy, self.attacker_params, self.opponent_params,
+                                        damage_type, category)[column]
+            taken = engine.damage_batch(enemy, own, self.opponent_params, self.attacker_params,
+                                        damage_type, enemy_categories)[column]
+            for row, (d, t) in enumerate(zip(dealt, taken)):
+                net[row] += d - t
+
+        per_candidate = n * len(engine.DAMAGE_TYPES)
+        return [sum(net[k * n:(k + 1) * n]) / per_candidate for k in range(len(candidates))]
+
+    def best(self, category, tech_group, tech_level):
+        """科技等级为 tech_level 时该科技组的最佳单位，返回 (单位键, 评分) 或 None"""
+        entry = self.groups.get((category, tech_group))
+        if entry is None:
+            return None
+        level = min(int(tech_level), self.max_level)
+        return entry['best'][level] if level >= 0 else None
@@ -0,0 +1,75 @@
+"""灵敏度分析：各参数每提升一点对战斗结果的边际价值
+
+对一组场景批量计算解析偏导数（engine.damage_gradient_batch），
+按 "A军造成的伤害 - A军受到的伤害" 对A军的每个参数和点数求偏导并取平均，
+排序后即可判断哪条理念、政策最值得选。
+
+场景中双方军队的结构与 battle.make_side 相同：{'values', 'category', 'params'}。
+"""
+import engine
+
+# 每"一点"对应的参数增量：加成、减成类参数按百分点计算，其余按 1 计算
+POINT_SIZE = dict.fromkeys(
+    ['morale_impact_bonus', 'morale_impact_reduction', 'shock_damage_bonus',
+     'fire_damage_bonus', 'shock_damage_reduction', 'fire_damage_reduction',
+     'infantry_combat_bonus', 'cavalry_combat_bonus', 'artillery_combat_bonus'], 0.01)
+
+RESULTS = ("morale", "manpower")
+
+
+def _columns(sides):
+    """把多支军队转换为按列的属性、参数和兵种"""
+    return ([side['values'] for side in sides],
+            {name: [side['params'][name] for side in sides] for name in engine.PARAM_NAMES},
+            [side['category'] for side in sides])
+
+
+def army_gradients(scenarios):
+    """批量计算A军净伤害对A军各变量的偏导数
+
+    scenarios 为 [(A军, B军), ...]。返回 {结果: {名称: 偏导列表}}，结果为 "morale" / "manpower"，
+    名称为 PARAM_NAMES 中的参数或 ATTRIBUTES 中的属性。
+    A军的参数在A军进攻时属于攻击方，在B军进攻时属于防御方，两部分相减即为净伤害的偏导。
+    """
+    a_values, a_params, a_categories = _columns([a for a, _ in scenarios])
+    b_values, b_params, b_categories = _columns([b for _, b in scenarios])
+    names = engine.PARAM_NAMES + engine.ATTRIBUTES
+    n = len(scenarios)
+    totals = {result: {name: [0.0] * n for name in names} for result in RESULTS}
+
+    for damage_type in engine.DAMAGE_TYPES:
+        _, _, dealt = engine.damage_gradient_batch(a_values, b_values, a_params, b_params,
+                                                   damage_type, a_categories)
+        _, _, taken = engine.damage_gradient_batch(b_values, a_values, b_params, a_params,
+                                                   damage_type, b_categories)
+        for index, result in enumerate(RESULTS):
+            for name in names:
+                column = totals[result][name]
+                for row, (d, t) in enumerate(zip(dealt[("attacker", name)][index],
+                                                 taken[("defender", name)][index])):
+                    column[row] += d - t
+    return totals
+
+
+def marginal_report(scenarios, result="manpower", points=None):
+    """按每点边际价值排序的报告
+
+    返回 [(名称, 每点价值), ...]，每点价值为各场景净伤害偏导的平均值乘以一点的大小，
+    points 可覆盖 POINT_SIZE 中每点的大小。
+    """
+    if result not in RESULTS:
+        raise ValueError(f"未知的结果类型: {result}")
+    if not scenarios:
+        return []
+    point_size = dict(POINT_SIZE, **(points or {}))
+    gradients = army_gradients(scenarios)[result]
+    report = [(name, sum(column) / len(column) * point_size.get(name, 1))
+              for name, column in gradients.items()]
+    report.sort(key=lambda item: item[1], reverse=True)
+    return report
+
+
+def format_report(report):
+    """把报告格式化为文本表格"""
+    width = max((len(name) for name, _ in report), default=0)
+    return "\n".join(f"{name:<{width}}  {value:+.6f}" for name, value in report)
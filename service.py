@@ -0,0 +1,212 @@
+"""本地查询服务（asyncio HTTP，可监听本机端口或 Unix socket）
+
+    POST /damage   请求体为 batch.py 中格式的单个场景（或场景列表），返回八项结果
+    GET  /stats    返回缓存命中/未命中次数、批次数等统计
+
+同一时间到达的请求会合并成一批调用 engine.mutual_damage，
+结果按 (双方单位, 双方参数) 缓存在有界的 LRU 缓存中。
+"""
+import asyncio
+import json
+import math
+from collections import OrderedDict
+
+import batch
+import engine
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY_SIZE = 1 << 20  # 请求体上限（字节），超出时返回 400 并关闭连接
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found"}
+
+
+class LRUCache:
+    """有界的最近最少使用缓存，记录命中和未命中次数"""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """取出缓存值，不存在时返回 None"""
+        value = self.items.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """写入缓存，超出容量时淘汰最久未使用的项"""
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
+
+    def stats(self):
+        return {'size': len(self.items), 'maxsize': self.maxsize,
+                'hits': self.hits, 'misses': self.misses}
+
+
+class DamageService:
+    """伤害查询服务：合并并发请求批量计算，并缓存结果"""
+
+    def __init__(self, db, cache_size=4096, batch_delay=0.002, max_batch=1024):
+        self.db = db
+        self.cache = LRUCache(cache_size)
+        self.batch_delay = batch_delay  # 收集同一批请求的等待时间（秒）
+        self.max_batch = max_batch
+        self.pending = {}               # 缓存键 -> (A军, B军, future)
+        self.flush_handle = None
+        self.batches = 0
+        self.batched_queries = 0
+
+    @staticmethod
+    def cache_key(a, b):
+        """缓存键：双方单位键和全部参数"""
+        (a_unit, _, a_params), (b_unit, _, b_params) = a, b
+        return (a_unit.key(), b_unit.key(),
+                tuple(a_params[name] for name in engine.PARAM_NAMES),
+                tuple(b_params[name] for name in engine.PARAM_NAMES))
+
+    async def query(self, scenario):
+        """计算单个场景，返回 {结果列: 值}"""
+        if not isinstance(scenario, dict):
+            raise ValueError("场景必须是 JSON 对象")
+        a = batch.parse_army(self.db, "A", scenario.get('A'))
+        b = batch.parse_army(self.db, "B", scenario.get('B'))
+        key = self.cache_key(a, b)
+
+        result = self.cache.get(key)
+        if result is None:
+            if key in self.pending:
+                # 同一批中相同的查询共用一次计算
+                future = self.pending[key][2]
+            else:
+                future = asyncio.get_running_loop().create_future()
+                self.pending[key] = (a, b, future)
+                self._schedule_flush()
+            result = await future
+
+        if 'id' in scenario:
+            return dict(result, id=scenario['id'])
+        return dict(result)
+
+    def _schedule_flush(self):
+        """批次满时立即计算，否则等待片刻收集更多请求"""
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(self.batch_delay, self.flush)
+
+    def flush(self):
+        """把等待中的请求作为一批计算并返回结果"""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        pending, self.pending = self.pending, {}
+        if not pending:
+            return
+        self.batches += 1
+        self.batched_queries += len(pending)
+
+        items = list(pending.items())
+        try:
+            results = batch.evaluate([(a, b) for _, (a, b, _) in items])
+        except ZeroDivisionError:
+            # 整批失败时逐个计算，只让出错的请求报告错误
+            for key, (a, b, future) in items:
+                try:
+                    self._resolve(key, future, batch.evaluate([(a, b)]), 0)
+                except ZeroDivisionError:
+                    if not future.done():
+                        future.set_exception(ValueError("除数为0（请检查军事战术）"))
+            return
+        for row, (key, (_, _, future)) in enumerate(items):
+            self._resolve(key, future, results, row)
+
+    def _resolve(self, key, future, results, row):
+        """写入缓存并唤醒等待的请求"""
+        result = {column: results[column][row] for column in engine.RESULT_COLUMNS}
+        if not all(math.isfinite(value) for value in result.values()):
+            # 无穷大不能输出为合法 JSON，也不缓存
+            if not future.done():
+                future.set_exception(ValueError("结果超出浮点数范围"))
+            return
+        self.cache.put(key, result)
+        if not future.done():
+            future.set_result(result)
+
+    def stats(self):
+        """服务统计"""
+        return {'cache': self.cache.stats(), 'batches': self.batches,
+                'batched_queries': self.batched_queries, 'units': len(self.db)}
+
+    async def dispatch(self, method, path, body):
+        """处理一个请求，返回 (状态码, JSON 对象)"""
+        if method == "GET" and path == "/stats":
+            return 200, self.stats()
+        if method == "POST" and path == "/damage":
+            try:
+                scenario = json.loads(body or b'null')
+                if isinstance(scenario, list):
+                    return 200, await asyncio.gather(*(self.query(item) for item in scenario))
+                return 200, await self.query(scenario)
+            except RecursionError:
+                return 400, {'error': "请求体嵌套过深"}
+            except (ValueError, KeyError, TypeError, AttributeError, ArithmeticError) as e:
+                return 400, {'error': str(e)}
+        return 404, {'error': f"未知的请求: {method} {path}"}
+
+    async def handle(self, reader, writer):
+        """处理一个连接（HTTP/1.1，支持长连接）"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if not 0 <= length <= MAX_BODY_SIZE:
+                    # 不读取请求体，回复后关闭连接
+                    headers['connection'] = 'close'
+                    status, payload = 400, {'error': f"请求体超过 {MAX_BODY_SIZE} 字节"}
+                else:
+                    body = await reader.readexactly(length)
+                    status, payload = await self.dispatch(method, path, body)
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                writer.write(f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                             f"Content-Type: application/json; charset=utf-8\r\n"
+                             f"Content-Length: {len(data)}\r\n\r\n".encode('latin-1') + data)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        """开始监听，给出 path 时使用 Unix socket，返回 asyncio 服务器"""
+        # 并发工具较多时默认的 backlog(100) 会导致连接被丢弃重试
+        if path:
+            return await asyncio.start_unix_server(self.handle, path=path, backlog=1024)
+        return await asyncio.start_server(self.handle, host, port, backlog=1024)
+
+
+async def serve(db, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, **options):
+    """运行服务直到被中断"""
+    server = await DamageService(db, **options).start(host, port, path)
+    async with server:
+        await server.serve_forever()
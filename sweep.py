@@ -0,0 +1,207 @@
+"""参数扫描与平衡点求解
+
+在任意参数的网格（笛卡尔积）上批量计算双方的伤害，结果按块流式写出；
+也可以直接求解使双方伤害相等的参数值。
+
+双方军队的结构与 battle.make_side 相同：{'values', 'category', 'params'}。
+扫描轴以 "A.参数名" / "B.参数名" 表示，例如 {"B.training": [0, 10, 20]}。
+"""
+import csv
+import json
+import os
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import engine
+
+CHUNK_SIZE = 10000  # 每块计算的行数
+
+
+def linspace(start, stop, num):
+    """生成包含两端的等距取值"""
+    if num == 1:
+        return [float(start)]
+    step = (stop - start) / (num - 1)
+    return [start + i * step for i in range(num)]
+
+
+def _parse_axis(axis):
+    """解析扫描轴名称 "A.training" -> ("A", "training")"""
+    army, _, name = axis.partition('.')
+    if army not in ("A", "B") or name not in engine.PARAM_NAMES:
+        raise ValueError(f"无效的扫描参数: {axis}")
+    return army, name
+
+
+def evaluate(side_a, side_b, overrides=None):
+    """计算双方互相打击的全部结果
+
+    overrides 为 {扫描轴: 标量或等长序列}，覆盖对应一方的参数。
+    返回 {结果列: 列表}。
+    """
+    params = {"A": dict(side_a['params']), "B": dict(side_b['params'])}
+    for axis, values in (overrides or {}).items():
+        army, name = _parse_axis(axis)
+        params[army][name] = values
+
+    return engine.mutual_damage([side_a['values']], [side_b['values']], params["A"], params["B"],
+                                side_a['category'], side_b['category'])
+
+
+def grid_size(axes):
+    """网格总行数"""
+    size = 1
+    for values in axes.values():
+        size *= len(values)
+    return size
+
+
+def _grid_columns(axes, start, stop):
+    """取出网格第 start 到 stop 行的各轴取值（按混合进制解码行号，最后一轴变化最快）"""
+    names = list(axes)
+    columns = {name: [] for name in names}
+    for row in range(start, stop):
+        for name in reversed(names):
+            row, index = divmod(row, len(axes[name]))
+            columns[name].append(axes[name][index])
+    return columns
+
+
+def _evaluate_chunk(side_a, side_b, axes, start, stop):
+    """计算一块网格（在工作进程中运行）"""
+    columns = _grid_columns(axes, start, stop)
+    columns.update(evaluate(side_a, side_b, columns))
+    return columns
+
+
+def iter_sweep(side_a, side_b, axes, workers=None, chunk_size=CHUNK_SIZE):
+    """按块产出扫描结果 {列名: 列表}，块的顺序与网格行顺序一致
+
+    workers 为进程数（默认CPU核数，1 表示在当前进程内运行）；
+    同时提交的块数有上限，内存占用与网格大小无关。
+    """
+    axes = {axis: list(values) for axis, values in axes.items()}
+    for axis in axes:
+        _parse_axis(axis)
+    total = grid_size(axes)
+    bounds = [(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(bounds) <= 1:
+        for start, stop in bounds:
+            yield _evaluate_chunk(side_a, side_b, axes, start, stop)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for start, stop in bounds:
+            pending.append(pool.submit(_evaluate_chunk, side_a, side_b, axes, start, stop))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class CsvWriter:
+    """把扫描结果按行写入 CSV 文件"""
+
+    def __init__(self, path):
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        self.writer = csv.writer(self.file)
+        self.columns = None
+
+    def write(self, chunk):
+        if self.columns is None:
+            self.columns = list(chunk)
+            self.writer.writerow(self.columns)
+        self.writer.writerows(zip(*(chunk[name] for name in self.columns)))
+
+    def close(self):
+        self.file.close()
+
+
+class ColumnarWriter:
+    """把扫描结果按列写入目录：每列一个 float64 二进制文件，另附 schema.json"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.files = None
+        self.rows = 0
+
+    def write(self, chunk):
+        if self.files is None:
+            self.files = {name: open(os.path.join(self.directory, f"{name}.f64"), 'wb')
+                          for name in chunk}
+        for name, file in self.files.items():
+            array('d', chunk[name]).tofile(file)
+        self.rows += len(next(iter(chunk.values()), ()))
+
+    def close(self):
+        for file in (self.files or {}).values():
+            file.close()
+        with open(os.path.join(self.directory, "schema.json"), 'w', encoding='utf-8') as file:
+            json.dump({'columns': list(self.files or {}), 'typecode': 'd', 'rows': self.rows},
+                      file, ensure_ascii=False)
+
+
+def read_columns(directory):
+    """读取 ColumnarWriter 写出的目录，返回 {列名: array}"""
+    with open(os.path.join(directory, "schema.json"), 'r', encoding='utf-8') as file:
+        schema = json.load(file)
+    columns = {}
+    for name in schema['columns']:
+        column = array(schema['typecode'])
+        with open(os.path.join(directory, f"{name}.f64"), 'rb') as file:
+            column.fromfile(file, schema['rows'])
+        columns[name] = column
+    return columns
+
+
+def sweep(side_a, side_b, axes, output, columnar=False, workers=None, chunk_size=CHUNK_SIZE):
+    """扫描参数网格并把结果流式写入 CSV 文件（columnar=True 时写入列式目录），返回行数"""
+    writer = ColumnarWriter(output) if columnar else CsvWriter(output)
+    rows = 0
+    try:
+        for chunk in iter_sweep(side_a, side_b, axes, workers, chunk_size):
+            writer.write(chunk)
+            rows += len(chunk[engine.RESULT_COLUMNS[0]])
+    finally:
+        writer.close()
+    return rows
+
+
+def break_even(side_a, side_b, axis, low, high, metric="fire_manpower",
+               tolerance=1e-9, max_iterations=200):
+    """求解使双方某项伤害相等的参数值
+
+    metric 为 "fire_morale" / "fire_manpower" / "shock_morale" / "shock_manpower"，
+    在 [low, high] 内用二分法求 A军伤害 - B军伤害 = 0 的根，区间两端须异号。
+    """
+    if f"a_{metric}" not in engine.RESULT_COLUMNS:
+        raise ValueError(f"未知的结果类型: {metric}")
+    _parse_axis(axis)
+
+    def gap(value):
+        results = evaluate(side_a, side_b, {axis: value})
+        return results[f"a_{metric}"][0] - results[f"b_{metric}"][0]
+
+    gap_low, gap_high = gap(low), gap(high)
+    if gap_low == 0:
+        return low
+    if gap_high == 0:
+        return high
+    if (gap_low > 0) == (gap_high > 0):
+        raise ValueError(f"区间 [{low}, {high}] 内双方差值同号，无法求解平衡点")
+
+    for _ in range(max_iterations):
+        middle = (low + high) / 2
+        gap_middle = gap(middle)
+        if gap_middle == 0 or high - low <= tolerance:
+            return middle
+        if (gap_middle > 0) == (gap_low > 0):
+            low, gap_low = middle, gap_middle
+        else:
+            high = middle
+    return (low + high) / 2
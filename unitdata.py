@@ -0,0 +1,498 @@
+"""单位数据文件解析与编译后的单位库（不依赖界面）"""
+import hashlib
+import os
+import pickle
+import re
+import sys
+from array import array
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import profiling
+
+# 兵种
+CATEGORIES = ["炮兵", "步兵", "骑兵"]
+
+ATTRIBUTE_COUNT = 6  # 每个单位的属性（点数）个数
+FIELD_COUNT = 2 + ATTRIBUTE_COUNT + 1  # 单位行的列数：科技等级、名称、六项属性、总和
+
+# 属性单元格，如 "2 pips 2"、"1 pip 1"（空白表示0）
+PIP_PATTERN = re.compile(r"(-?\d+)\s*pips?(?:\s+(-?\d+))?", re.IGNORECASE)
+
+# 误用空格分隔的单位行的开头：科技等级后跟空白和名称（还需含有属性单元格才算）
+SPACED_UNIT_PATTERN = re.compile(r"\d+\s+\S")
+
+MAX_REPORTED_ERRORS = 20  # DataError 的消息中最多列出的错误行数
+
+# 单位库缓存格式版本，格式变化时递增使旧缓存失效
+CACHE_VERSION = 4
+
+
+class LineError(namedtuple('LineError', 'filename line message')):
+    """数据文件中某一行的错误"""
+    __slots__ = ()
+
+    def __str__(self):
+        return f"{self.filename}:{self.line}: {self.message}"
+
+
+class DataError(ValueError):
+    """数据文件有错误，errors 为全部 LineError"""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        message = "\n".join(str(error) for error in self.errors[:MAX_REPORTED_ERRORS])
+        if len(self.errors) > MAX_REPORTED_ERRORS:
+            message += f"\n……另有 {len(self.errors) - MAX_REPORTED_ERRORS} 处错误"
+        super().__init__(message)
+
+
+def default_cache_dir(filename):
+    """默认缓存目录：数据文件同级的 .cache"""
+    return os.path.join(os.path.dirname(os.path.abspath(filename)), ".cache")
+
+
+def parse_pips(cell):
+    """解析属性单元格，空白为0，无法识别时抛出 ValueError"""
+    cell = cell.strip()
+    if not cell:
+        return 0
+    match = PIP_PATTERN.fullmatch(cell)
+    if match is None or match.group(2) not in (None, match.group(1)):
+        raise ValueError(f"无法识别的属性 {cell!r}")
+    value = int(match.group(1))
+    if not -128 <= value <= 127:
+        raise ValueError(f"属性超出范围 {cell!r}")
+    return value
+
+
+def parse_unit_line(line):
+    """解析单位行，返回 (科技等级, 名称, 属性列表, 总和)，格式错误时抛出 ValueError"""
+    parts = line.split('\t')
+    if len(parts) < FIELD_COUNT or any(part.strip() for part in parts[FIELD_COUNT:]):
+        raise ValueError(f"应有 {FIELD_COUNT} 列（科技等级、名称、六项属性、总和），实际为 {len(parts)} 列")
+    tech_level, name, total = parts[0].strip(), parts[1].strip(), parts[FIELD_COUNT - 1].strip()
+    if not tech_level.isdigit() or int(tech_level) > 65535:
+        raise ValueError(f"科技等级应为非负整数: {tech_level!r}")
+    if not name:
+        raise ValueError("缺少单位名称")
+
+    values = []
+    for column, cell in enumerate(parts[2:2 + ATTRIBUTE_COUNT], 3):
+        try:
+            values.append(parse_pips(cell))
+        except ValueError as e:
+            raise ValueError(f"第 {column} 列{e}") from None
+
+    if not total.isdigit():
+        raise ValueError(f"第 {FIELD_COUNT} 列总和应为非负整数: {total!r}")
+    if int(total) != sum(values):
+        raise ValueError(f"总和 {total} 与六项属性之和 {sum(values)} 不一致")
+    return tech_level, name, values, int(total)
+
+
+def iter_unit_file(filename, errors=None, tech_groups=None):
+    """逐行解析数据文件
+
+    产出 (兵种, 科技组, 单位) 记录，单位为 (科技等级, 名称, 属性列表, 总和)；
+    遇到科技组标题时产出单位为 None 的记录，以便登记没有单位的科技组。
+    有错误的行不产出记录：给出 errors 列表时把 LineError 追加到其中并继续，否则抛出 DataError。
+    不含制表符、也不是兵种名的行是科技组标题（模组可以自定义科技组），
+    tech_groups 为允许的科技组前缀，None 表示接受任何科技组；不允许的科技组连同其单位一起跳过。
+    """
+    if not os.path.exists(filename):
+        raise FileNotFoundError(f"找不到文件: {filename}")
+
+    def report(line_number, message):
+        error = LineError(filename, line_number, message)
+        if errors is None:
+            raise DataError([error])
+        errors.append(error)
+
+    with open(filename, 'r', encoding='utf-8') as file:
+        current_category = None
+        current_tech_group = None
+        skipping = False  # 当前科技组不在 tech_groups 中
+
+        for line_number, line in enumerate(file, 1):
+            line = line.rstrip('\r\n')
+            if not line.strip():
+                continue
+
+            if '\t' not in line:
+                header = line.strip()
+                if header in CATEGORIES:
+                    current_category, current_tech_group, skipping = header, None, False
+                elif SPACED_UNIT_PATTERN.match(header) and PIP_PATTERN.search(header):
+                    # 以科技等级开头且含属性单元格的是误用空格分隔的单位行，不能当作科技组
+                    report(line_number, f"单位行应以制表符分隔: {header!r}")
+                elif current_category is None:
+                    report(line_number, f"科技组 {header!r} 之前缺少兵种标题")
+                elif tech_groups is not None and not any(header.startswith(group)
+                                                         for group in tech_groups):
+                    report(line_number, f"未知的科技组 {header!r}")
+                    current_tech_group, skipping = None, True
+                else:
+                    current_tech_group, skipping = header, False
+                    yield current_category, current_tech_group, None
+            elif skipping:
+                continue
+            elif current_tech_group is None:
+                report(line_number, "单位行之前缺少兵种或科技组标题")
+            else:
+                try:
+                    unit = parse_unit_line(line)
+                except ValueError as e:
+                    report(line_number, str(e))
+                else:
+                    yield current_category, current_tech_group, unit
+
+
+def parse_unit_file(filename, errors=None, tech_groups=None):
+    """解析数据文件，返回 {兵种: {科技组: [单位, ...]}}（错误处理同 iter_unit_file）"""
+    data = {category: {} for category in CATEGORIES}
+    for category, tech_group, unit in iter_unit_file(filename, errors, tech_groups):
+        if unit is None:
+            data[category][tech_group] = []
+        else:
+            tech_level, name, values, total = unit
+            data[category][tech_group].append({
+                'tech_level': tech_level,
+                'name': name,
+                'values': values,
+                'total': total
+            })
+    return data
+
+
+def iter_units(data):
+    """按文件顺序遍历全部单位，产出 ((兵种, 科技组, 科技等级, 名称), 单位)"""
+    for category, groups in data.items():
+        for tech_group, units in groups.items():
+            for unit in units:
+                yield (category, tech_group, unit['tech_level'], unit['name']), unit
+
+
+class Unit:
+    """单位记录：只保存所属单位库和编号，属性从单位库的列中读取
+
+    支持 unit['values'] 形式的访问，可直接替代解析结果中的单位字典。
+    """
+    __slots__ = ('db', 'index')
+
+    def __init__(self, db, index):
+        self.db = db
+        self.index = index
+
+    @property
+    def category(self):
+        return self.db.categories[self.db.unit_category[self.index]]
+
+    @property
+    def tech_group(self):
+        return self.db.group_names[self.db.unit_group[self.index]]
+
+    @property
+    def tech_level(self):
+        return str(self.db.unit_level[self.index])
+
+    @property
+    def name(self):
+        return self.db.unit_name[self.index]
+
+    @property
+    def values(self):
+        return self.db.values(self.index)
+
+    @property
+    def total(self):
+        return self.db.unit_total[self.index]
+
+    def __getitem__(self, field):
+        if field not in ('tech_level', 'name', 'values', 'total'):
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def key(self):
+        """单位键 (兵种, 科技组, 科技等级, 名称)"""
+        return self.db.key(self.index)
+
+    def as_dict(self):
+        """转换为解析结果相同的字典形式"""
+        return {'tech_level': self.tech_level, 'name': self.name,
+                'values': self.values, 'total': self.total}
+
+    def __eq__(self, other):
+        return isinstance(other, Unit) and self.db is other.db and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.db), self.index))
+
+    def __repr__(self):
+        return f"Unit{self.key()}"
+
+
+class UnitDB:
+    """编译后的单位库（列式存储）
+
+    每个单位占用各列中的一格：六项属性按列存放在连续的整数数组中
+    （columns[j][i] 为第 i 个单位的第 j 项），兵种和科技组存为编号，
+    名称经过驻留（intern）。另外预先建立按 (兵种, 科技组)、科技等级和名称的索引，
+    索引中的单位编号同样保存在整数数组中，界面查询均为字典查找。
+    """
+
+    def __init__(self, records=()):
+        # 逐单位的列
+        self.unit_category = array('H')   # 兵种编号（对应 categories）
+        self.unit_group = array('H')      # 科技组编号（对应 group_names）
+        self.unit_level = array('H')
+        self.unit_name = []
+        self.unit_total = array('H')
+        self.columns = [array('b') for _ in range(ATTRIBUTE_COUNT)]
+        self.same_name = array('i')       # 下一个同名单位的编号（-1 表示没有）
+
+        # 索引
+        self.categories = list(CATEGORIES)  # 兵种
+        self.group_names = []               # 科技组
+        self.groups = {category: [] for category in self.categories}  # 兵种 -> [科技组, ...]
+        self.levels = {}         # (兵种, 科技组) -> [科技等级, ...]（升序字符串）
+        self.by_level = {}       # (兵种, 科技组, 科技等级) -> 单位编号数组
+        self.by_tech_level = {}  # 科技等级 -> 单位编号数组
+        self.by_name = {}        # 名称 -> 第一个同名单位的编号（其余经 same_name 串联）
+
+        self.extend(records)
+
+    def extend(self, records):
+        """追加 iter_unit_file 产出的记录；与已有单位键相同的单位覆盖其属性（用于合并模组）"""
+        for category, tech_group, unit in records:
+            self._add_group(category, tech_group)
+            if unit is not None:
+                self._add_unit(category, tech_group, *unit)
+        for levels in self.levels.values():
+            levels.sort(key=int)
+
+    def merge(self, other):
+        """并入另一个单位库，结果与按顺序 extend 其全部记录相同
+
+        与已有单位键相同的单位就地覆盖属性，其余单位按列整批追加。
+        """
+        for category, groups in other.groups.items():
+            for tech_group in groups:
+                self._add_group(category, tech_group)
+
+        offset = len(self)
+        new_ids = array('i')  # other 中的编号 -> 并入后的编号
+        added = []            # 需要追加的单位在 other 中的编号
+        for i, name in enumerate(other.unit_name):
+            j = self.find(*other.key(i)) if name in self.by_name else None
+            if j is None:
+                new_ids.append(offset + len(added))
+                added.append(i)
+            else:
+                new_ids.append(j)
+                self.unit_total[j] = other.unit_total[i]
+                for column, source in zip(self.columns, other.columns):
+                    column[j] = source[i]
+
+        category_codes = [self.categories.index(category) for category in other.categories]
+        group_codes = [self.group_names.index(tech_group) for tech_group in other.group_names]
+        self.unit_category.extend(category_codes[other.unit_category[i]] for i in added)
+        self.unit_group.extend(group_codes[other.unit_group[i]] for i in added)
+        self.unit_level.extend(other.unit_level[i] for i in added)
+        self.unit_total.extend(other.unit_total[i] for i in added)
+        for column, source in zip(self.columns, other.columns):
+            column.extend(source[i] for i in added)
+        for i in added:
+            name = sys.intern(other.unit_name[i])
+            self.unit_name.append(name)
+            self.same_name.append(self.by_name.get(name, -1))
+            self.by_name[name] = new_ids[i]
+
+        for (category, tech_group, tech_level), ids in other.by_level.items():
+            key = (category, sys.intern(tech_group), sys.intern(tech_level))
+            ids = [new_ids[i] for i in ids if new_ids[i] >= offset]
+            if not ids:
+                continue
+            if key not in self.by_level:
+                self.levels[key[:2]].append(key[2])
+                self.by_level[key] = array('I')
+            self.by_level[key].extend(ids)
+        for tech_level, ids in other.by_tech_level.items():
+            ids = [new_ids[i] for i in ids if new_ids[i] >= offset]
+            if ids:
+                self.by_tech_level.setdefault(sys.intern(tech_level), array('I')).extend(ids)
+        for levels in self.levels.values():
+            levels.sort(key=int)
+
+    def _add_group(self, category, tech_group):
+        """登记兵种和科技组"""
+        if category not in self.groups:
+            self.categories.append(category)
+            self.groups[category] = []
+        if tech_group not in self.groups[category]:
+            tech_group = sys.intern(tech_group)
+            self.groups[category].append(tech_group)
+            self.levels[(category, tech_group)] = []
+            if tech_group not in self.group_names:
+                self.group_names.append(tech_group)
+
+    def _add_unit(self, category, tech_group, tech_level, name, values, total):
+        """追加一个单位并登记索引，单位键已存在时覆盖属性"""
+        tech_level = sys.intern(str(int(tech_level)))
+        name = sys.intern(name)
+        i = self.find(category, tech_group, tech_level, name)
+        if i is not None:
+            self.unit_total[i] = total
+            for column, value in zip(self.columns, values):
+                column[i] = value
+            return
+
+        i = len(self.unit_name)
+        self.unit_category.append(self.categories.index(category))
+        self.unit_group.append(self.group_names.index(tech_group))
+        self.unit_level.append(int(tech_level))
+        self.unit_name.append(name)
+        self.unit_total.append(total)
+        for column, value in zip(self.columns, values):
+            column.append(value)
+        # 新单位插到同名链表头部
+        self.same_name.append(self.by_name.get(name, -1))
+        self.by_name[name] = i
+
+        if (category, tech_group, tech_level) not in self.by_level:
+            self.levels[(category, tech_group)].append(tech_level)
+            self.by_level[(category, tech_group, tech_level)] = array('I')
+        self.by_level[(category, tech_group, tech_level)].append(i)
+        self.by_tech_level.setdefault(tech_level, array('I')).append(i)
+
+    def __len__(self):
+        return len(self.unit_name)
+
+    def key(self, i):
+        """单位键 (兵种, 科技组, 科技等级, 名称)"""
+        return (self.categories[self.unit_category[i]], self.group_names[self.unit_group[i]],
+                str(self.unit_level[i]), self.unit_name[i])
+
+    def values(self, i):
+        """单位的六项属性"""
+        return [column[i] for column in self.columns]
+
+    def unit(self, i):
+        """返回单位记录"""
+        return Unit(self, i)
+
+    def units_named(self, name):
+        """所有同名单位的编号"""
+        i = self.by_name.get(name, -1)
+        while i >= 0:
+            yield i
+            i = self.same_name[i]
+
+    def find(self, category, tech_group, tech_level, name):
+        """按单位键查找单位编号，找不到返回 None"""
+        try:
+            tech_level = int(tech_level)
+        except ValueError:
+            return None
+        for i in self.units_named(name):
+            if (self.unit_level[i] == tech_level
+                    and self.categories[self.unit_category[i]] == category
+                    and self.group_names[self.unit_group[i]] == tech_group):
+                return i
+        return None
+
+    def units_at(self, category, tech_group, tech_level):
+        """某兵种、科技组在指定科技等级的单位编号"""
+        return self.by_level.get((category, tech_group, str(tech_level)), ())
+
+    @classmethod
+    @profiling.instrument("unitdata.from_files")
+    def from_files(cls, filenames, errors=None, tech_groups=None, workers=None):
+        """按顺序读取并合并多个数据文件（基础数据在前，模组在后）
+
+        多个文件在多个进程中并行解析（workers 为进程数，默认取文件数与CPU核数的较小值，
+        1 表示在当前进程内依次解析），解析完的文件按顺序依次并入。
+        错误处理同 iter_unit_file：给出 errors 列表时收集全部错误并跳过有错的行，
+        否则在全部文件解析完后抛出 DataError。
+        """
+        filenames = list(filenames)
+        found = []
+        workers = workers or min(len(filenames), os.cpu_count() or 1)
+        db = None
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            if pool is None:
+                parts = (_compile_file(filename, tech_groups) for filename in filenames)
+            else:
+                parts = pool.map(_compile_file, filenames, repeat(tech_groups))
+            for part, part_errors in parts:
+                found.extend(part_errors)
+                if db is None:
+                    db = part
+                else:
+                    db.merge(part)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        db = db if db is not None else cls()
+        profiling.count("unitdata.units_parsed", len(db))
+        _report(found, errors)
+        return db
+
+    @classmethod
+    @profiling.instrument("unitdata.load")
+    def load(cls, filenames, cache_dir=None, errors=None, tech_groups=None, workers=None):
+        """读取单位库：数据文件均未变化（修改时间和大小一致）时直接读取二进制缓存
+
+        filenames 可以是单个文件名或按合并顺序排列的文件名列表，
+        errors、tech_groups、workers 的含义同 from_files；缓存中同时保存数据错误，
+        读取缓存时照样报告。
+        """
+        if isinstance(filenames, str):
+            filenames = [filenames]
+        paths = [os.path.abspath(filename) for filename in filenames]
+        stamp = [CACHE_VERSION, None if tech_groups is None else list(tech_groups)]
+        for path in paths:
+            stat = os.stat(path)
+            stamp.append((path, stat.st_mtime_ns, stat.st_size))
+        cache_dir = cache_dir or default_cache_dir(paths[0])
+        name = hashlib.sha1("\n".join(paths).encode('utf-8')).hexdigest()[:16]
+        cache_path = os.path.join(cache_dir, f"units-{name}.pickle")
+
+        try:
+            with open(cache_path, 'rb') as file:
+                cached_stamp, db, found = pickle.load(file)
+            if cached_stamp == stamp:
+                profiling.count("unitdata.cache_hits")
+                _report(found, errors)
+                return db
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, AttributeError):
+            pass
+
+        found = []
+        db = cls.from_files(paths, found, tech_groups, workers)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(cache_path + ".tmp", 'wb') as file:
+                pickle.dump((stamp, db, found), file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(cache_path + ".tmp", cache_path)
+        except OSError:
+            pass  # 缓存写入失败不影响使用
+        _report(found, errors)
+        return db
+
+
+def _compile_file(filename, tech_groups=None):
+    """解析并编译一个数据文件（可在工作进程中运行），返回 (单位库, 错误列表)"""
+    errors = []
+    return UnitDB(iter_unit_file(filename, errors, tech_groups)), errors
+
+
+def _report(found, errors):
+    """把收集到的错误交给调用方：给出 errors 列表时追加，否则有错误时抛出 DataError"""
+    profiling.count("unitdata.errors", len(found))
+    if errors is not None:
+        errors.extend(found)
+    elif found:
+        raise DataError(found)